@@ -3,7 +3,6 @@ import bmesh
 import logging
 import math
 import os
-import re
 from collections import defaultdict, deque, namedtuple
 from math import cos, pi, sin
 from typing import Any, Dict, List, Optional, Set, Tuple
@@ -19,6 +18,7 @@ from bpy.props import (
     IntProperty,
     StringProperty,
 )
+from bpy.app.handlers import persistent
 from bpy.types import Operator, Panel, PropertyGroup, Scene
 from bpy_extras.io_utils import ImportHelper
 
@@ -35,6 +35,7 @@ from .utils import (
     make_texture_patterns,
     logger,
     get_mesh_data,
+    find_mesh_data,
     set_material_view,
     set_solid_view,
     find_texture,
@@ -43,6 +44,9 @@ from .utils import (
     darken_eye_colors,
     get_suffix,
     extract_character_name,
+    clear_caches,
+    index_original_materials,
+    WW_MATERIAL_RE,
 )
 from .import_shader import WW_OT_ImportShader, WW_OT_ImportTextures
 from .rigify import WW_OT_Rigify
@@ -66,71 +70,109 @@ bl_info = {
 
 
 
-def update_light(self, context):
-    value = context.scene.light_mode_value
-    if not (0 <= value <= 6):
-        return
-    if node_group := bpy.data.node_groups.get("Global Material Properties"):
-        for node in node_group.nodes:
-            if (
-                node.type == "GROUP"
-                and node.node_tree
-                and node.node_tree.name == "Color Palette"
+# key -> (node count when indexed, [(node name, input index)])
+_INPUT_REGISTRY: Dict[Tuple, Tuple[int, List[Tuple[str, int]]]] = {}
+
+_CUSTOM_COLOR_PROPS = {
+    "Custom Ambient": "amb_color",
+    "Custom Light": "light_color",
+    "Custom Shadow": "shadow_color",
+    "Custom Rim Tint": "rim_color",
+}
+
+
+def _name_matches(name, target, exact):
+    return name == target if exact else target in name
+
+
+def _is_group_node(node, group_name, exact):
+    return (
+        node.type == "GROUP"
+        and node.node_tree
+        and (group_name is None or _name_matches(node.node_tree.name, group_name, exact))
+    )
+
+
+def _group_inputs(owner_name, nodes, input_name, socket_type="VALUE", group_name=None, exact=False):
+    # Sockets are remembered by (node name, input index) rather than by
+    # reference, so a stale entry is detected and rebuilt instead of
+    # touching freed node data after undo or node deletion. An entry is
+    # only reused while the tree has the same node count, so added
+    # nodes are picked up.
+    key = (owner_name, group_name, input_name, socket_type, exact)
+    entry = _INPUT_REGISTRY.get(key)
+    if entry and entry[0] == len(nodes):
+        sockets = []
+        for node_name, index in entry[1]:
+            node = nodes.get(node_name)
+            if not (
+                node
+                and index < len(node.inputs)
+                and _is_group_node(node, group_name, exact)
+                and node.inputs[index].type == socket_type
+                and _name_matches(node.inputs[index].name, input_name, exact)
             ):
-                for input in node.inputs:
-                    if input.type == "VALUE" and input.name == "Value":
-                        input.default_value = float(value)
-                    if value == 6 and input.type == "RGBA":
-                        if input.name == "Custom Ambient":
-                            context.scene.amb_color = input.default_value
-                        elif input.name == "Custom Light":
-                            context.scene.light_color = input.default_value
-                        elif input.name == "Custom Shadow":
-                            context.scene.shadow_color = input.default_value
-                        elif input.name == "Custom Rim Tint":
-                            context.scene.rim_color = input.default_value
-
-
-def update_shadow_transition_range(self, context):
-    if not context.active_object or context.active_object.type != "MESH":
-        return
-    mesh_name = context.active_object.name.split(".")[0]
-    data = next(
-        (m for m in context.scene.mesh_texture_mappings if m.mesh_name == mesh_name),
-        None,
+                break
+            sockets.append(node.inputs[index])
+        else:
+            return sockets
+
+    refs = [
+        (node.name, i)
+        for node in nodes
+        if _is_group_node(node, group_name, exact)
+        for i, input in enumerate(node.inputs)
+        if input.type == socket_type and _name_matches(input.name, input_name, exact)
+    ]
+    if refs:
+        _INPUT_REGISTRY[key] = (len(nodes), refs)
+    else:
+        _INPUT_REGISTRY.pop(key, None)
+    return [nodes[node_name].inputs[i] for node_name, i in refs]
+
+
+def _set_input_value(input, value):
+    # Socket writes tag the node tree for re-evaluation even when the value
+    # is unchanged, so only write real changes.
+    current = input.default_value
+    if isinstance(value, (int, float)):
+        if current != value:
+            input.default_value = value
+    elif tuple(current) != tuple(value):
+        input.default_value = value
+
+
+def _material_inputs(material, input_name, group_name=None):
+    return _group_inputs(
+        material.name, material.node_tree.nodes, input_name, group_name=group_name
     )
-    if not data:
-        data = context.scene.mesh_texture_mappings.add()
-        data.mesh_name = mesh_name
-    value = self.shadow_transition_range_value
-    for slot in context.active_object.material_slots:
-        if slot.material and slot.material.use_nodes:
-            for node in slot.material.node_tree.nodes:
-                if node.type == "GROUP" and node.node_tree:
-                    for input in node.inputs:
-                        if input.type == "VALUE" and "Shadow Transition Range" in input.name:
-                            input.default_value = value
 
 
-def update_face_shadow_softness(self, context):
-    if not context.active_object or context.active_object.type != "MESH":
+def _get_active_mesh_data(context):
+    return get_mesh_data(context, context.active_object.name.split(".")[0])
+
+
+def update_light(self, context):
+    value = context.scene.light_mode_value
+    if not (0 <= value <= 6):
         return
-    mesh_name = context.active_object.name.split(".")[0]
-    data = next(
-        (m for m in context.scene.mesh_texture_mappings if m.mesh_name == mesh_name),
-        None,
-    )
-    if not data:
-        data = context.scene.mesh_texture_mappings.add()
-        data.mesh_name = mesh_name
-    value = self.face_shadow_softness_value
-    for slot in context.active_object.material_slots:
-        if slot.material and slot.material.use_nodes:
-            for node in slot.material.node_tree.nodes:
-                if node.type == "GROUP" and node.node_tree:
-                    for input in node.inputs:
-                        if input.type == "VALUE" and "Face Shadow Softness" in input.name:
-                            input.default_value = value
+    if node_group := bpy.data.node_groups.get("Global Material Properties"):
+        for input in _group_inputs(
+            node_group.name, node_group.nodes, "Value", group_name="Color Palette", exact=True
+        ):
+            _set_input_value(input, float(value))
+        if value == 6:
+            for input_name, prop_name in _CUSTOM_COLOR_PROPS.items():
+                for input in _group_inputs(
+                    node_group.name,
+                    node_group.nodes,
+                    input_name,
+                    socket_type="RGBA",
+                    group_name="Color Palette",
+                    exact=True,
+                ):
+                    if tuple(getattr(context.scene, prop_name)) != tuple(input.default_value):
+                        setattr(context.scene, prop_name, input.default_value)
 
 
 def update_shadow(self, context):
@@ -138,10 +180,9 @@ def update_shadow(self, context):
     if not (0.0 <= value <= 2.0):
         return
     if node_group := bpy.data.node_groups.get("Global Material Properties"):
-        for node in node_group.nodes:
-            if node.name == "Global Properties" and node.type == "GROUP_OUTPUT":
-                if "Shadow Position" in node.inputs:
-                    node.inputs["Shadow Position"].default_value = value
+        node = node_group.nodes.get("Global Properties")
+        if node and node.type == "GROUP_OUTPUT" and "Shadow Position" in node.inputs:
+            _set_input_value(node.inputs["Shadow Position"], value)
 
 
 def update_catch_shadows(self, context):
@@ -149,154 +190,152 @@ def update_catch_shadows(self, context):
     if not (0 <= value <= 1):
         return
     if node_group := bpy.data.node_groups.get("Global Material Properties"):
-        for node in node_group.nodes:
-            if node.name == "Global Properties" and node.type == "GROUP_OUTPUT":
-                if "Catch Shadows" in node.inputs:
-                    node.inputs["Catch Shadows"].default_value = value
+        node = node_group.nodes.get("Global Properties")
+        if node and node.type == "GROUP_OUTPUT" and "Catch Shadows" in node.inputs:
+            _set_input_value(node.inputs["Catch Shadows"], value)
 
 
 def update_colors(self, context):
     if context.scene.light_mode_value != 6:
         return
-    custom_colors = {
-        "Custom Ambient": context.scene.amb_color,
-        "Custom Light": context.scene.light_color,
-        "Custom Shadow": context.scene.shadow_color,
-        "Custom Rim Tint": context.scene.rim_color,
-    }
     if node_group := bpy.data.node_groups.get("Global Material Properties"):
-        for node in node_group.nodes:
-            if (
-                node.type == "GROUP"
-                and node.node_tree
-                and node.node_tree.name == "Color Palette"
+        for input_name, prop_name in _CUSTOM_COLOR_PROPS.items():
+            for input in _group_inputs(
+                node_group.name,
+                node_group.nodes,
+                input_name,
+                socket_type="RGBA",
+                group_name="Color Palette",
+                exact=True,
             ):
-                for input in node.inputs:
-                    if input.type == "RGBA" and input.name in custom_colors:
-                        input.default_value = custom_colors[input.name]
+                _set_input_value(input, getattr(context.scene, prop_name))
 
 
-def update_blush(self, context):
-    if not context.active_object or context.active_object.type != "MESH":
-        return
-    mesh_name = context.active_object.name.split(".")[0]
-    data = next(
-        (m for m in context.scene.mesh_texture_mappings if m.mesh_name == mesh_name),
-        None,
-    )
-    if not data:
-        data = context.scene.mesh_texture_mappings.add()
-        data.mesh_name = mesh_name
-    value = self.blush_value
-    for slot in context.active_object.material_slots:
-        if (
-            slot.material
-            and slot.material.use_nodes
-            and "WW - Face" in slot.material.name
-        ):
-            for node in slot.material.node_tree.nodes:
-                if node.type == "GROUP" and node.node_tree:
-                    for input in node.inputs:
-                        if input.type == "VALUE" and "Blush" in input.name:
-                            input.default_value = value
+SliderSpec = namedtuple("SliderSpec", ["mat_filter", "group_filter", "input_name"])
 
+_SLIDER_SPECS = {
+    "blush_value": SliderSpec("WW - Face", None, "Blush"),
+    "disgust_value": SliderSpec("WW - Face", None, "Disgust"),
+    "metallic_value": SliderSpec(None, "WW - Main", "Enable Metallics"),
+    "specular_value": SliderSpec(None, "WW - Main", "Specular Multiplier"),
+    "shadow_transition_range_value": SliderSpec(None, None, "Shadow Transition Range"),
+    "face_shadow_softness_value": SliderSpec(None, None, "Face Shadow Softness"),
+}
 
-def update_disgust(self, context):
-    if not context.active_object or context.active_object.type != "MESH":
-        return
-    mesh_name = context.active_object.name.split(".")[0]
-    data = next(
-        (m for m in context.scene.mesh_texture_mappings if m.mesh_name == mesh_name),
-        None,
-    )
-    if not data:
-        data = context.scene.mesh_texture_mappings.add()
-        data.mesh_name = mesh_name
-    value = self.disgust_value
-    for slot in context.active_object.material_slots:
-        if (
-            slot.material
-            and slot.material.use_nodes
-            and "WW - Face" in slot.material.name
-        ):
-            for node in slot.material.node_tree.nodes:
-                if node.type == "GROUP" and node.node_tree:
-                    for input in node.inputs:
-                        if input.type == "VALUE" and "Disgust" in input.name:
-                            input.default_value = value
+
+def _node_materials(obj, name_filter=None):
+    materials = (slot.material for slot in obj.material_slots)
+    return [
+        material
+        for material in materials
+        if material
+        and material.use_nodes
+        and (name_filter is None or name_filter in material.name)
+    ]
 
 
-def update_metallic(self, context):
-    if not context.active_object or context.active_object.type != "MESH":
+def _apply_slider(self, context, prop_name):
+    obj = context.active_object
+    if not obj or obj.type != "MESH":
         return
-    mesh_name = context.active_object.name.split(".")[0]
-    data = next(
-        (m for m in context.scene.mesh_texture_mappings if m.mesh_name == mesh_name),
-        None,
-    )
-    if not data:
-        data = context.scene.mesh_texture_mappings.add()
-        data.mesh_name = mesh_name
-    value = self.metallic_value
-    for slot in context.active_object.material_slots:
-        if slot.material and slot.material.use_nodes:
-            for node in slot.material.node_tree.nodes:
-                if (
-                    node.type == "GROUP"
-                    and node.node_tree
-                    and "WW - Main" in node.node_tree.name
-                ):
-                    for input in node.inputs:
-                        if input.type == "VALUE" and "Enable Metallics" in input.name:
-                            input.default_value = value
+    # A slider drawn from a MeshTextureData entry already has its mapping;
+    # only the scene-level fallback needs one created.
+    if not isinstance(self, MeshTextureData):
+        _get_active_mesh_data(context)
+    spec = _SLIDER_SPECS[prop_name]
+    value = getattr(self, prop_name)
+    for material in _node_materials(obj, spec.mat_filter):
+        for input in _material_inputs(material, spec.input_name, spec.group_filter):
+            _set_input_value(input, value)
 
 
-def update_specular(self, context):
-    if not context.active_object or context.active_object.type != "MESH":
-        return
-    mesh_name = context.active_object.name.split(".")[0]
-    data = next(
-        (m for m in context.scene.mesh_texture_mappings if m.mesh_name == mesh_name),
-        None,
+def _slider_update(prop_name):
+    def update(self, context):
+        _apply_slider(self, context, prop_name)
+
+    return update
+
+
+update_blush = _slider_update("blush_value")
+update_disgust = _slider_update("disgust_value")
+update_metallic = _slider_update("metallic_value")
+update_specular = _slider_update("specular_value")
+update_shadow_transition_range = _slider_update("shadow_transition_range_value")
+update_face_shadow_softness = _slider_update("face_shadow_softness_value")
+
+
+class MeshTextureData(PropertyGroup):
+    mesh_name: StringProperty(name="Mesh Name", description="Name of the mesh")
+    textures: StringProperty(
+        name="Textures", description="List of textures for this mesh"
+    )
+    tex_mode: BoolProperty(
+        name="Texture Mode", description="Texture priority mode", default=True
+    )
+    star_move: BoolProperty(
+        name="Star Move", description="Enable star movement effect", default=False
+    )
+    hair_trans: BoolProperty(
+        name="Hair Transparency",
+        description="Enable hair transparency effect",
+        default=False,
+    )
+    metallic_value: FloatProperty(
+        name="Metallic Value",
+        description="Control the metallic appearance of materials",
+        default=1.0,
+        min=0.0,
+        max=1.0,
+        precision=1,
+        update=update_metallic,
+    )
+    specular_value: FloatProperty(
+        name="Specular Value",
+        description="Control the specular intensity of materials",
+        default=0.1,
+        min=0.0,
+        max=1.0,
+        precision=1,
+        update=update_specular,
+    )
+    blush_value: FloatProperty(
+        name="Blush",
+        description="Control the blush intensity on face materials",
+        default=0.0,
+        min=0.0,
+        max=1.0,
+        precision=1,
+        update=update_blush,
+    )
+    disgust_value: FloatProperty(
+        name="Disgust",
+        description="Control the disgust expression intensity on face materials",
+        default=0.0,
+        min=0.0,
+        max=1.0,
+        precision=1,
+        update=update_disgust,
     )
-    if not data:
-        data = context.scene.mesh_texture_mappings.add()
-        data.mesh_name = mesh_name
-    value = self.specular_value
-    for slot in context.active_object.material_slots:
-        if slot.material and slot.material.use_nodes:
-            for node in slot.material.node_tree.nodes:
-                if (
-                    node.type == "GROUP"
-                    and node.node_tree
-                    and "WW - Main" in node.node_tree.name
-                ):
-                    for input in node.inputs:
-                        if (
-                            input.type == "VALUE"
-                            and "Specular Multiplier" in input.name
-                        ):
-                            input.default_value = value
 
 
-def add_scene_props():
-    Scene.original_materials = StringProperty(default="")
-    Scene.original_textures = StringProperty(default="")
-    Scene.ww_setup_status = StringProperty(default="IDLE")
-    Scene.tex_dir = StringProperty(subtype="DIR_PATH")
-    Scene.is_first_use = BoolProperty(default=True)
-    Scene.outlines_enabled = BoolProperty(default=False)
-    Scene.texture_priority_mode = BoolProperty(default=True)
-    Scene.mesh_texture_mappings = CollectionProperty(type=MeshTextureData)
-    Scene.light_mode_value = IntProperty(
+_SCENE_PROPS = {
+    "original_materials": StringProperty(default=""),
+    "original_textures": StringProperty(default=""),
+    "ww_setup_status": StringProperty(default="IDLE"),
+    "tex_dir": StringProperty(subtype="DIR_PATH"),
+    "is_first_use": BoolProperty(default=True),
+    "outlines_enabled": BoolProperty(default=False),
+    "texture_priority_mode": BoolProperty(default=True),
+    "mesh_texture_mappings": CollectionProperty(type=MeshTextureData),
+    "light_mode_value": IntProperty(
         name="Light Mode",
         description="Select the lighting mode for the character",
         default=0,
         min=0,
         max=6,
         update=update_light,
-    )
-    Scene.blush_value = FloatProperty(
+    ),
+    "blush_value": FloatProperty(
         name="Blush",
         description="Control the blush intensity on face materials",
         default=0.0,
@@ -304,8 +343,8 @@ def add_scene_props():
         max=1.0,
         precision=1,
         update=update_blush,
-    )
-    Scene.disgust_value = FloatProperty(
+    ),
+    "disgust_value": FloatProperty(
         name="Disgust",
         description="Control the disgust expression intensity on face materials",
         default=0.0,
@@ -313,8 +352,8 @@ def add_scene_props():
         max=1.0,
         precision=1,
         update=update_disgust,
-    )
-    Scene.metallic_value = FloatProperty(
+    ),
+    "metallic_value": FloatProperty(
         name="Metallic Value",
         description="Control the metallic appearance of materials",
         default=1.0,
@@ -322,8 +361,8 @@ def add_scene_props():
         max=1.0,
         precision=1,
         update=update_metallic,
-    )
-    Scene.specular_value = FloatProperty(
+    ),
+    "specular_value": FloatProperty(
         name="Specular Value",
         description="Control the specular intensity of materials",
         default=0.1,
@@ -331,8 +370,8 @@ def add_scene_props():
         max=1.0,
         precision=1,
         update=update_specular,
-    )
-    Scene.amb_color = FloatVectorProperty(
+    ),
+    "amb_color": FloatVectorProperty(
         name="Ambient Color",
         description="Custom ambient light color",
         default=(1.0, 1.0, 1.0, 1.0),
@@ -341,8 +380,8 @@ def add_scene_props():
         subtype="COLOR",
         size=4,
         update=update_colors,
-    )
-    Scene.light_color = FloatVectorProperty(
+    ),
+    "light_color": FloatVectorProperty(
         name="Light Color",
         description="Custom light color",
         default=(1.0, 1.0, 1.0, 1.0),
@@ -351,8 +390,8 @@ def add_scene_props():
         subtype="COLOR",
         size=4,
         update=update_colors,
-    )
-    Scene.face_shadow_softness_value = FloatProperty(
+    ),
+    "face_shadow_softness_value": FloatProperty(
         name="Face Shadow Softness",
         description="Control the softness of shadows on the face",
         default=0.01,
@@ -360,8 +399,8 @@ def add_scene_props():
         max=1.0,
         precision=2,
         update=update_face_shadow_softness,
-    )
-    Scene.shadow_transition_range_value = FloatProperty(
+    ),
+    "shadow_transition_range_value": FloatProperty(
         name="Shadow Transition Range",
         description="Control the range of shadow transitions",
         default=0.01,
@@ -369,8 +408,8 @@ def add_scene_props():
         max=1.0,
         precision=2,
         update=update_shadow_transition_range,
-    )
-    Scene.shadow_color = FloatVectorProperty(
+    ),
+    "shadow_color": FloatVectorProperty(
         name="Shadow Color",
         description="Custom shadow color",
         default=(1.0, 1.0, 1.0, 1.0),
@@ -379,8 +418,8 @@ def add_scene_props():
         subtype="COLOR",
         size=4,
         update=update_colors,
-    )
-    Scene.rim_color = FloatVectorProperty(
+    ),
+    "rim_color": FloatVectorProperty(
         name="Rim Color",
         description="Custom rim light color",
         default=(1.0, 1.0, 1.0, 1.0),
@@ -389,18 +428,18 @@ def add_scene_props():
         subtype="COLOR",
         size=4,
         update=update_colors,
-    )
-    Scene.shader_file_path = StringProperty(
+    ),
+    "shader_file_path": StringProperty(
         name="Shader File",
         description="Path to the shader .blend file",
         subtype="FILE_PATH",
-    )
-    Scene.face_panel_file_path = StringProperty(
+    ),
+    "face_panel_file_path": StringProperty(
         name="Face Panel File",
         description="Path to the face panel .blend file",
         subtype="FILE_PATH",
-    )
-    Scene.shadow_position = FloatProperty(
+    ),
+    "shadow_position": FloatProperty(
         name="Shadow Position",
         description="Control the position of shadows",
         default=0.55,
@@ -408,69 +447,27 @@ def add_scene_props():
         max=2.0,
         precision=2,
         update=update_shadow,
-    )
-    Scene.catch_shadows = IntProperty(
+    ),
+    "catch_shadows": IntProperty(
         name="Catch Shadows",
         description="Toggle whether objects catch shadows",
         default=1,
         min=0,
         max=1,
         update=update_catch_shadows,
-    )
+    ),
+}
 
 
-class MeshTextureData(PropertyGroup):
-    mesh_name: StringProperty(name="Mesh Name", description="Name of the mesh")
-    textures: StringProperty(
-        name="Textures", description="List of textures for this mesh"
-    )
-    tex_mode: BoolProperty(
-        name="Texture Mode", description="Texture priority mode", default=True
-    )
-    star_move: BoolProperty(
-        name="Star Move", description="Enable star movement effect", default=False
-    )
-    hair_trans: BoolProperty(
-        name="Hair Transparency",
-        description="Enable hair transparency effect",
-        default=False,
-    )
-    metallic_value: FloatProperty(
-        name="Metallic Value",
-        description="Control the metallic appearance of materials",
-        default=1.0,
-        min=0.0,
-        max=1.0,
-        precision=1,
-        update=update_metallic,
-    )
-    specular_value: FloatProperty(
-        name="Specular Value",
-        description="Control the specular intensity of materials",
-        default=0.1,
-        min=0.0,
-        max=1.0,
-        precision=1,
-        update=update_specular,
-    )
-    blush_value: FloatProperty(
-        name="Blush",
-        description="Control the blush intensity on face materials",
-        default=0.0,
-        min=0.0,
-        max=1.0,
-        precision=1,
-        update=update_blush,
-    )
-    disgust_value: FloatProperty(
-        name="Disgust",
-        description="Control the disgust expression intensity on face materials",
-        default=0.0,
-        min=0.0,
-        max=1.0,
-        precision=1,
-        update=update_disgust,
-    )
+def add_scene_props():
+    for name, prop in _SCENE_PROPS.items():
+        setattr(Scene, name, prop)
+
+
+def unregister_scene_props():
+    for name in _SCENE_PROPS:
+        if hasattr(Scene, name):
+            delattr(Scene, name)
 
 
 class WW_OT_ImportUEModel(Operator):
@@ -662,24 +659,15 @@ class WW_OT_ToggleTexMode(Operator):
 
     def reassign_textures(self, context, textures: List[Any], tex_mode: bool):
         assigned_count = 0
+        mi_index = index_original_materials(context.active_object.material_slots)
         for slot in context.active_object.material_slots:
             if not slot.material or not (
-                match := re.search(
-                    r"WW - ([A-Za-z]+)(_?\d+|(?:_[^_]+)*)?", slot.material.name
-                )
+                match := WW_MATERIAL_RE.search(slot.material.name)
             ):
                 continue
 
             base, version = match.group(1), match.group(2) or ""
-            original_name = next(
-                (
-                    s.material.name
-                    for s in context.active_object.material_slots
-                    if s.material
-                    and re.match(rf"MI_.*?{base}{version}$", s.material.name)
-                ),
-                None,
-            )
+            original_name = mi_index.get(base + version)
             material_info = MaterialDetails(base, version, original_name)
             mat_tex_data = MaterialTextureData(
                 slot.material,
@@ -1063,14 +1051,7 @@ class VIEW3D_PT_WutheringWaves(Panel):
             if active_obj and active_obj.type == "MESH"
             else ""
         )
-        data = next(
-            (
-                m
-                for m in context.scene.mesh_texture_mappings
-                if m.mesh_name == mesh_name
-            ),
-            None,
-        )
+        data = find_mesh_data(context, mesh_name)
 
         box = layout.box()
         row = box.row()
@@ -1118,14 +1099,7 @@ class VIEW3D_PT_WutheringWaves_Appearance(Panel):
             if active_obj and active_obj.type == "MESH"
             else ""
         )
-        data = next(
-            (
-                m
-                for m in context.scene.mesh_texture_mappings
-                if m.mesh_name == mesh_name
-            ),
-            None,
-        )
+        data = find_mesh_data(context, mesh_name)
 
         box = layout.box()
         row = box.row()
@@ -1284,41 +1258,38 @@ classes = [
 ]
 
 
+_CACHE_HANDLERS = (
+    bpy.app.handlers.load_post,
+    bpy.app.handlers.undo_post,
+    bpy.app.handlers.redo_post,
+)
+
+
+@persistent
+def _clear_addon_caches(*args):
+    clear_caches(*args)
+    _INPUT_REGISTRY.clear()
+
+
 def register():
     for cls in classes:
         bpy.utils.register_class(cls)
     add_scene_props()
+    for handlers in _CACHE_HANDLERS:
+        handlers.append(_clear_addon_caches)
     logger.info("Shader (.fbx / .uemodel) registered")
 
 
 def unregister():
+    for handlers in _CACHE_HANDLERS:
+        if _clear_addon_caches in handlers:
+            handlers.remove(_clear_addon_caches)
+    _clear_addon_caches()
+
     for cls in reversed(classes):
         bpy.utils.unregister_class(cls)
 
-    for prop in [
-        "rim_color",
-        "shadow_color",
-        "light_color",
-        "amb_color",
-        "specular_value",
-        "metallic_value",
-        "mesh_texture_mappings",
-        "texture_priority_mode",
-        "outlines_enabled",
-        "is_first_use",
-        "tex_dir",
-        "original_textures",
-        "original_materials",
-        "shader_file_path",
-        "face_panel_file_path",
-        "light_mode_value",
-        "shadow_position",
-        "catch_shadows",
-        "shadow_transition_range_value",
-        "face_shadow_softness_value",
-    ]:
-        if hasattr(Scene, prop):
-            delattr(Scene, prop)
+    unregister_scene_props()
 
     logger.info("Shader (.fbx / .uemodel) unregistered")
 
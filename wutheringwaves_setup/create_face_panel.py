@@ -4,6 +4,7 @@ import mathutils
 import bmesh
 import os
 import re
+import numpy as np
 from typing import Set
 from collections import defaultdict, deque
 
@@ -12,7 +13,7 @@ from bpy.props import StringProperty
 from bpy_extras.io_utils import ImportHelper
 from mathutils import Vector
 
-from .utils import get_armature_from_modifiers, logger
+from .utils import get_armature_from_modifiers, logger, set_child_of_inverse
 
 preserved_shape_keys = {
     "Pupil_Up", "Pupil_Down", "Pupil_R", "Pupil_L", "Pupil_Scale",
@@ -21,6 +22,114 @@ preserved_shape_keys = {
     "Pupil_R.L", "Pupil_R.R", "Pupil_L.L", "Pupil_L.R"
 }
 
+# Single-variable face panel drivers:
+# (bone, shape key, bone property, variable name, expression, skip if the bone is missing)
+FACE_PANEL_DRIVERS = (
+    *(
+        (bone_name, shape_key_name, "location.y", "bone_var", "bone_var * 50", True)
+        for bone_name, shape_key_name in (
+            ("Smile.L", "E_Smile_L"), ("Smile.R", "E_Smile_R"),
+            ("Anger.L", "E_Anger.L"), ("Sad.L", "E_Sad.L"),
+            ("Focus.L", "E_Focus.L"), ("Insipid.L", "E_Insipid.L"),
+            ("Anger.R", "E_Anger.R"), ("Sad.R", "E_Sad.R"),
+            ("Focus.R", "E_Focus.R"), ("Insipid.R", "E_Insipid.R"),
+            ("B_Anger", "B_Anger"), ("B_Happy", "B_Happy"),
+            ("B_Cheerful", "B_Cheerful"), ("B_Sad", "B_Sad"),
+            ("B_Flat", "B_Flat"), ("B_Inside_Add", "B_Inside_Add"),
+            ("EyeScale", "E_Blephar"),
+        )
+    ),
+    ("Mouth.L", "M_Smile_L", "location.y", "mouth_y", "max(mouth_y * 50, 0)", True),
+    ("Mouth.L", "M_Ennui_L", "location.y", "mouth_y", "max(-mouth_y * 50, 0)", True),
+    ("Mouth.R", "M_Smile_R", "location.y", "mouth_y", "max(mouth_y * 50, 0)", True),
+    ("Mouth.R", "M_Ennui_R", "location.y", "mouth_y", "max(-mouth_y * 50, 0)", True),
+    ("Mouth.L", "P_M_L_Add", "location.x", "x_pos", "max(min(x_pos / 0.01, 1), 0)", True),
+    ("Mouth.L", "P_M_Scale_Add.L", "location.x", "x_neg", "max(min(-x_neg / 0.01, 1), 0)", True),
+    ("Mouth.R", "P_M_Scale_Add.R", "location.x", "x_pos", "max(min(x_pos / 0.01, 1), 0)", True),
+    ("Mouth.R", "P_M_R_Add", "location.x", "x_neg", "max(min(-x_neg / 0.01, 1), 0)", True),
+    ("EyeTracker", "E_Close", "scale.y", "scaleval", "(1 - scaleval) * 2", True),
+    ("Eye.L", "E_Close.L", "scale.y", "scaleval", "(1 - scaleval) * 2", True),
+    ("Eye.R", "E_Close.R", "scale.y", "scaleval", "(1 - scaleval) * 2", True),
+    ("EyeScale", "Pupil_Scale", "scale.x", "scaleval", "(1 - scaleval) * 2", True),
+    ("EyeTracker", "E_Stare", "scale.y", "yscale", "max(min((yscale - 1) * 2, 1), 0)", True),
+    *(
+        (name, name, "location.y", "yval", "max(min(yval / 0.02, 1), 0)", False)
+        for name in (
+            "M_OpenSmall", "M_Laugh", "M_Scared", "M_ScaredTooth", "M_Anger",
+            "M_Trapezoid", "M_Nutcracker", "Aa", "M_A", "M_O",
+        )
+    ),
+)
+
+# Vowel shape key: (Mouth location axis, expression). E and I fade out as the mouth opens.
+VOWEL_DRIVERS = {
+    shape_key_name: (
+        axis,
+        "(1 - oval * 0.6) * "
+        + ("(1 - min(abs(yval) / 0.02, 1)) * " if axis == "x" else "")
+        + f"max(min(({direction} * coord) / {max_value}, 1), 0)",
+    )
+    for shape_key_name, axis, direction, max_value in (
+        ("E", "x", -1, 0.02),
+        ("I", "x", 1, 0.02),
+        ("A", "y", 1, 0.02),
+        ("U", "y", -1, 0.02),
+    )
+}
+O_SHAPE_EXPRESSION = "max(min(((abs(s_x) + abs(s_y) + abs(s_z)) / 3 - 1) / 0.5, 1), 0)"
+EYEBROW_Y_EXPRESSIONS = {
+    shape_key_name: f"max(min(({direction} * yval) / 0.01, 1), 0)"
+    for shape_key_name, direction in (("B_Up_Add", 1), ("B_Down_Add", -1))
+}
+EYEBROW_Z_EXPRESSIONS = {
+    shape_key_name: f"max(min(({direction} * zrot) / {math.radians(angle_deg):.5f}, 1), 0)"
+    for shape_key_name, direction, angle_deg in (("B_AH_L", -1, 10), ("B_AH_R", 1, 10))
+}
+PUPIL_SHAPE_KEYS = {
+    "Pupil_L": "LOC_X", "Pupil_R": "LOC_X",
+    "Pupil_Up": "LOC_Y", "Pupil_Down": "LOC_Y"
+}
+PUPIL_EXPRESSIONS = {
+    "Pupil_L": 'max(min((bone_x * 10), 1), 0) if bone_x > 0 else 0',
+    "Pupil_R": 'max(min((-bone_x * 10), 1), 0) if bone_x < 0 else 0',
+    "Pupil_Up": 'max(min((bone_y * 10), 1), 0) if bone_y > 0 else 0',
+    "Pupil_Down": 'max(min((-bone_y * 10), 1), 0) if bone_y < 0 else 0'
+}
+
+# Offsets along Z used to lay out the face panel bones (frozen, only used in + / -)
+BONE_Z_001 = Vector((0.0, 0.0, 0.01)).freeze()
+BONE_Z_002 = Vector((0.0, 0.0, 0.02)).freeze()
+EYEBROWS_Z_OFFSET = Vector((0.0, 0.0, 0.06)).freeze()
+MOUTH_PANEL_Z_OFFSET = Vector((0.0, 0.0, 0.055)).freeze()
+HEAD_ORIGIN_OFFSET = Vector((0.0, 0.0, 0.2)).freeze()
+
+
+def make_bone_var(driver, name, armature, data_path):
+    var = driver.variables.new()
+    var.name = name
+    target = var.targets[0]
+    target.id = armature
+    target.data_path = data_path
+    return var
+
+
+def make_transform_var(driver, name, armature, bone_name, transform_type):
+    var = driver.variables.new()
+    var.name = name
+    var.type = 'TRANSFORMS'
+    target = var.targets[0]
+    target.id = armature
+    target.bone_target = bone_name
+    target.transform_type = transform_type
+    target.transform_space = 'LOCAL_SPACE'
+    return var
+
+
+def configure_scripted_driver(driver, armature, data_path, expression, var_name):
+    driver.type = 'SCRIPTED'
+    make_bone_var(driver, var_name, armature, data_path)
+    driver.expression = expression
+
 
 def delete_shape_key_drivers(mesh, preserved_shape_keys):
     if mesh.data.shape_keys:
@@ -56,7 +165,7 @@ class WW_OT_SetupHeadDriver(Operator):
 
         if active_obj.type == "ARMATURE":
             armature = active_obj
-            mesh = self.get_mesh_from_armature(armature)
+            mesh = self.get_mesh_from_armature(context, armature)
             if not mesh:
                 self.report(
                     {"ERROR"}, "No mesh found associated with the selected armature."
@@ -71,7 +180,7 @@ class WW_OT_SetupHeadDriver(Operator):
 
         mesh_name = mesh.name.split(".")[0]
         head_origin, light_direction = self.get_model_specific_objects(
-            mesh, mesh_name)
+            context, mesh, mesh_name)
 
         if not head_origin or not light_direction:
             self.report(
@@ -79,16 +188,21 @@ class WW_OT_SetupHeadDriver(Operator):
             )
             return {"CANCELLED"}
 
-        self.parent_objects(armature, head_origin, light_direction)
+        armature_matrix = armature.matrix_world.copy()
+        armature_matrix_inv = armature_matrix.inverted()
 
-        head_bone = self.reset_head_driver(mesh_name, armature, head_origin)
+        self.parent_objects(armature, armature_matrix_inv, head_origin, light_direction)
+
+        head_bone = self.reset_head_driver(
+            mesh_name, armature, armature_matrix, head_origin)
         if not head_bone:
             self.report(
                 {"WARNING"},
                 "Head bone not found. Head Origin may not be properly positioned.",
             )
 
-        pos_bone = self.reset_light_direction(armature, light_direction)
+        pos_bone = self.reset_light_direction(
+            armature, armature_matrix, light_direction)
         if not pos_bone:
             self.report(
                 {"WARNING"},
@@ -102,13 +216,18 @@ class WW_OT_SetupHeadDriver(Operator):
 
         return {"FINISHED"}
 
-    def get_mesh_from_armature(self, armature):
-        for obj in bpy.data.objects:
-            if obj.type == "MESH" and get_armature_from_modifiers(obj) == armature:
-                return obj
-        return None
-
-    def get_model_specific_objects(self, mesh, mesh_name):
+    def get_mesh_from_armature(self, context, armature):
+        # Alphabetical like bpy.data.objects, but only over objects in the scene
+        return min(
+            (
+                obj for obj in context.scene.objects
+                if obj.type == "MESH" and get_armature_from_modifiers(obj) == armature
+            ),
+            key=lambda obj: obj.name,
+            default=None,
+        )
+
+    def get_model_specific_objects(self, context, mesh, mesh_name):
         modifier = mesh.modifiers.get(f"Light Vectors {mesh_name}")
         if modifier and modifier.type == "NODES":
             light_direction = modifier.get("Input_3")
@@ -116,13 +235,12 @@ class WW_OT_SetupHeadDriver(Operator):
             if light_direction and head_origin:
                 return head_origin, light_direction
 
-        head_origin = None
         light_direction = None
-
-        for obj in bpy.data.objects:
-            if obj.name.startswith("Head Origin"):
-                head_origin = obj
-                break
+        head_origin = min(
+            (obj for obj in context.scene.objects if obj.name.startswith("Head Origin")),
+            key=lambda obj: obj.name,
+            default=None,
+        )
 
         if head_origin:
             suffix = head_origin.name[len("Head Origin"):]
@@ -130,88 +248,49 @@ class WW_OT_SetupHeadDriver(Operator):
 
         return head_origin, light_direction
 
-    def parent_objects(self, armature, head_origin, light_direction):
+    def parent_objects(self, armature, armature_matrix_inv, head_origin, light_direction):
         for obj in (head_origin, light_direction):
             if obj:
                 obj.parent = armature
-                obj.matrix_parent_inverse = armature.matrix_world.inverted()
+                obj.matrix_parent_inverse = armature_matrix_inv
 
-    def reset_head_driver(self, mesh_name, armature, head_origin):
+    def reset_head_driver(self, mesh_name, armature, armature_matrix, head_origin):
         head_bone_names = ["c_head.x", "Bip001Head", "head"]
-        head_bone = None
-
-        for bone_name in head_bone_names:
-            if bone_name in armature.data.bones:
-                head_bone = bone_name
-                break
+        bones = armature.data.bones
+        bone = next(
+            (b for bone_name in head_bone_names if (b := bones.get(bone_name))),
+            bones[0] if bones else None,
+        )
 
-        if not head_bone and armature.data.bones:
-            head_bone = armature.data.bones[0].name
-
-        if not head_bone:
+        if not bone:
             return None
 
-        bone = armature.data.bones[head_bone]
-        bone_world_pos = armature.matrix_world @ bone.head_local
-        relative_position = Vector((0, 0, 0.2))
-        head_origin.location = bone_world_pos + relative_position
+        head_bone = bone.name
+        bone_world_pos = armature_matrix @ bone.head_local
+        head_origin.location = bone_world_pos + HEAD_ORIGIN_OFFSET
 
-        for const in head_origin.constraints:
-            head_origin.constraints.remove(const)
+        head_origin.constraints.clear()
 
         constraint = head_origin.constraints.new("CHILD_OF")
         constraint.target = armature
         constraint.subtarget = head_bone
 
-        bpy.ops.object.mode_set(mode="OBJECT")
-        bpy.ops.object.select_all(action="DESELECT")
-        head_origin.select_set(True)
-        bpy.context.view_layer.objects.active = head_origin
-
-        context_override = {
-            "object": head_origin,
-            "active_object": head_origin,
-            "selected_objects": [head_origin],
-            "selected_editable_objects": [head_origin],
-            "active_editable_object": head_origin,
-            "constraint": constraint,
-        }
-
-        try:
-            with bpy.context.temp_override(**context_override):
-                bpy.ops.constraint.childof_set_inverse(
-                    constraint=constraint.name, owner="OBJECT"
-                )
-        except Exception as e:
-            self.report(
-                {"WARNING"}, f"Failed to set constraint inverse: {str(e)}")
-            try:
-                constraint.inverse_matrix = (
-                    armature.matrix_world.inverted() @ head_origin.matrix_world
-                )
-            except Exception as e2:
-                self.report({"WARNING"}, f"Manual inverse failed: {str(e2)}")
-
-        head_origin.select_set(False)
+        set_child_of_inverse(constraint)
         return head_bone
 
-    def reset_light_direction(self, armature, light_direction):
+    def reset_light_direction(self, armature, armature_matrix, light_direction):
         pos_bone_names = ["c_pos", "Root"]
-        pos_bone = None
-
-        for bone_name in pos_bone_names:
-            if bone_name in armature.data.bones:
-                pos_bone = bone_name
-                break
-
-        if not pos_bone and armature.data.bones:
-            pos_bone = armature.data.bones[0].name
+        bones = armature.data.bones
+        bone = next(
+            (b for bone_name in pos_bone_names if (b := bones.get(bone_name))),
+            bones[0] if bones else None,
+        )
 
-        if not pos_bone:
+        if not bone:
             return None
 
-        bone = armature.data.bones[pos_bone]
-        bone_world_pos = armature.matrix_world @ bone.head_local
+        pos_bone = bone.name
+        bone_world_pos = armature_matrix @ bone.head_local
         light_direction.location = bone_world_pos
         light_direction.rotation_euler = (-1.5708, 0, 0)
         return pos_bone
@@ -234,334 +313,114 @@ class WW_OT_CreateFacePanel(bpy.types.Operator):
         if not context.active_object:
             return False
         obj = context.active_object
-        if obj.type == 'MESH':
-            for mod in obj.modifiers:
-                if mod.type == 'ARMATURE' and mod.object:
-                    return True
-        elif obj.type == 'ARMATURE':
+        if obj.type == 'ARMATURE':
             return True
+        if obj.type == 'MESH':
+            return any(mod.type == 'ARMATURE' and mod.object for mod in obj.modifiers)
         return False
 
     def setup_create_panel_drivers(self, context, armature_obj, CharacterMesh):
-        shape_key_mappings = {
-            "Smile.L": {"shape_key": "E_Smile_L", "var_type": "LOC_Y"},
-            "Smile.R": {"shape_key": "E_Smile_R", "var_type": "LOC_Y"},
-            "Anger.L": {"shape_key": "E_Anger.L", "var_type": "LOC_Y"},
-            "Sad.L": {"shape_key": "E_Sad.L", "var_type": "LOC_Y"},
-            "Focus.L": {"shape_key": "E_Focus.L", "var_type": "LOC_Y"},
-            "Insipid.L": {"shape_key": "E_Insipid.L", "var_type": "LOC_Y"},
-            "Anger.R": {"shape_key": "E_Anger.R", "var_type": "LOC_Y"},
-            "Sad.R": {"shape_key": "E_Sad.R", "var_type": "LOC_Y"},
-            "Focus.R": {"shape_key": "E_Focus.R", "var_type": "LOC_Y"},
-            "Insipid.R": {"shape_key": "E_Insipid.R", "var_type": "LOC_Y"},
-            "B_Anger": {"shape_key": "B_Anger", "var_type": "LOC_Y"},
-            "B_Happy": {"shape_key": "B_Happy", "var_type": "LOC_Y"},
-            "B_Cheerful": {"shape_key": "B_Cheerful", "var_type": "LOC_Y"},
-            "B_Sad": {"shape_key": "B_Sad", "var_type": "LOC_Y"},
-            "B_Flat": {"shape_key": "B_Flat", "var_type": "LOC_Y"},
-            "B_Inside_Add": {"shape_key": "B_Inside_Add", "var_type": "LOC_Y"},
-            "EyeScale": {"shape_key": "E_Blephar", "var_type": "LOC_Y"}
-        }
-        mouth_mappings = {
-            "Mouth.L": {
-                "positive_shape": "M_Smile_L",
-                "negative_shape": "M_Ennui_L",
-                "multiplier": 50,
-                "var_type": "LOC_Y"
-            },
-            "Mouth.R": {
-                "positive_shape": "M_Smile_R",
-                "negative_shape": "M_Ennui_R",
-                "multiplier": 50,
-                "var_type": "LOC_Y"
-            }
-        }
-        mouth_x_mappings = {
-            "Mouth.L": {
-                "negative_shape": "P_M_Scale_Add.L",
-                "positive_shape": "P_M_L_Add"
-            },
-            "Mouth.R": {
-                "negative_shape": "P_M_R_Add",
-                "positive_shape": "P_M_Scale_Add.R"
-            }
-        }
-        for bone_name, mapping in shape_key_mappings.items():
-            if bone_name not in armature_obj.pose.bones:
-                continue
-            bone = armature_obj.pose.bones[bone_name]
-            if not CharacterMesh.data.shape_keys:
-                continue
-            shape_key = CharacterMesh.data.shape_keys.key_blocks.get(
-                mapping["shape_key"])
-            if not shape_key:
-                continue
-            driver = shape_key.driver_add('value').driver
-            driver.type = 'SCRIPTED'
-            var = driver.variables.new()
-            var.name = 'bone_var'
-            var.targets[0].id = armature_obj
-            var.targets[0].data_path = (
-                f'pose.bones["{bone.name}"].location.y' if mapping["var_type"] == "LOC_Y"
-                else f'pose.bones["{bone.name}"].location.x'
-            )
-            driver.expression = "bone_var * 50"
-        for bone_name, mapping in mouth_mappings.items():
-            if bone_name not in armature_obj.pose.bones:
-                continue
-            bone = armature_obj.pose.bones[bone_name]
-            multiplier = mapping["multiplier"]
-            if mapping["positive_shape"]:
-                shape_key = CharacterMesh.data.shape_keys.key_blocks.get(
-                    mapping["positive_shape"])
-                if shape_key:
-                    driver = shape_key.driver_add('value').driver
-                    driver.type = 'SCRIPTED'
-                    var = driver.variables.new()
-                    var.name = 'mouth_y'
-                    var.targets[0].id = armature_obj
-                    var.targets[0].data_path = f'pose.bones["{bone.name}"].location.y'
-                    driver.expression = f'max(mouth_y * {multiplier}, 0)'
-            if mapping["negative_shape"]:
-                shape_key = CharacterMesh.data.shape_keys.key_blocks.get(
-                    mapping["negative_shape"])
-                if shape_key:
-                    driver = shape_key.driver_add('value').driver
-                    driver.type = 'SCRIPTED'
-                    var = driver.variables.new()
-                    var.name = 'mouth_y'
-                    var.targets[0].id = armature_obj
-                    var.targets[0].data_path = f'pose.bones["{bone.name}"].location.y'
-                    driver.expression = f'max(-mouth_y * {multiplier}, 0)'
-        for bone_name, mapping in mouth_x_mappings.items():
-            if bone_name not in armature_obj.pose.bones:
-                continue
-            bone = armature_obj.pose.bones[bone_name]
-            x_data_path = f'pose.bones["{bone.name}"].location.x'
-            pos_shape = CharacterMesh.data.shape_keys.key_blocks.get(
-                mapping["positive_shape"])
-            if pos_shape:
-                driver = pos_shape.driver_add('value').driver
-                driver.type = 'SCRIPTED'
-                var = driver.variables.new()
-                var.name = 'x_pos'
-                var.targets[0].id = armature_obj
-                var.targets[0].data_path = x_data_path
-                driver.expression = 'max(min(x_pos / 0.01, 1), 0)'
-            neg_shape = CharacterMesh.data.shape_keys.key_blocks.get(
-                mapping["negative_shape"])
-            if neg_shape:
-                driver = neg_shape.driver_add('value').driver
-                driver.type = 'SCRIPTED'
-                var = driver.variables.new()
-                var.name = 'x_neg'
-                var.targets[0].id = armature_obj
-                var.targets[0].data_path = x_data_path
-                driver.expression = 'max(min(-x_neg / 0.01, 1), 0)'
-        eye_scale_mappings = {
-            "EyeTracker": "E_Close",
-            "Eye.L": "E_Close.L",
-            "Eye.R": "E_Close.R",
-            "EyeScale": "Pupil_Scale",
-        }
-        for bone_name, shape_key_name in eye_scale_mappings.items():
-            if bone_name not in armature_obj.pose.bones:
-                continue
-            shape_key = CharacterMesh.data.shape_keys.key_blocks.get(
-                shape_key_name)
-            if not shape_key:
-                continue
-            driver = shape_key.driver_add('value').driver
-            driver.type = 'SCRIPTED'
-            var = driver.variables.new()
-            var.name = 'scaleval'
-            var.targets[0].id = armature_obj
-            if bone_name == "EyeScale":
-                var.targets[0].data_path = f'pose.bones["{bone_name}"].scale.x'
-                driver.expression = '(1 - scaleval) * 2'
-            else:
-                var.targets[0].data_path = f'pose.bones["{bone_name}"].scale.y'
-                driver.expression = '(1 - scaleval) * 2'
-        bone_name = "EyeTracker"
-        shape_key_name = "E_Stare"
-        if bone_name in armature_obj.pose.bones:
-            shape_key = CharacterMesh.data.shape_keys.key_blocks.get(
-                shape_key_name)
-            if shape_key:
-                driver = shape_key.driver_add('value').driver
-                driver.type = 'SCRIPTED'
-                var = driver.variables.new()
-                var.name = 'yscale'
-                var.targets[0].id = armature_obj
-                var.targets[0].data_path = f'pose.bones["{bone_name}"].scale.y'
-                driver.expression = 'max(min((yscale - 1) * 2, 1), 0)'
-        vowel_shapes = {
-            "E": {"axis": "x", "direction": -1, "max_value": 0.02},
-            "I": {"axis": "x", "direction": 1, "max_value": 0.02},
-            "A": {"axis": "y", "direction": 1, "max_value": 0.02},
-            "U": {"axis": "y", "direction": -1, "max_value": 0.02},
-        }
-        mouth_bone = armature_obj.pose.bones.get("Mouth")
-        if mouth_bone:
-            for shape_key_name, info in vowel_shapes.items():
-                shape_key = CharacterMesh.data.shape_keys.key_blocks.get(
-                    shape_key_name)
+        shape_keys = CharacterMesh.data.shape_keys
+        if not shape_keys:
+            self.report(
+                {'WARNING'}, f"'{CharacterMesh.name}' has no shape keys; face panel drivers were not set up.")
+            return
+        key_blocks = shape_keys.key_blocks
+        pose_bones = armature_obj.pose.bones
+        pose_bone_names = set(pose_bones.keys())
+        # Add every driver first, then fill them in
+        table_drivers = [
+            (shape_key.driver_add('value').driver, bone_name, bone_property, var_name, expression)
+            for bone_name, shape_key_name, bone_property, var_name, expression, needs_bone in FACE_PANEL_DRIVERS
+            if (not needs_bone or bone_name in pose_bone_names)
+            and (shape_key := key_blocks.get(shape_key_name))
+        ]
+        for driver, bone_name, bone_property, var_name, expression in table_drivers:
+            configure_scripted_driver(
+                driver, armature_obj, f'pose.bones["{bone_name}"].{bone_property}',
+                expression, var_name)
+        if "Mouth" in pose_bone_names:
+            for shape_key_name, (axis, expression) in VOWEL_DRIVERS.items():
+                shape_key = key_blocks.get(shape_key_name)
                 if not shape_key:
                     continue
                 driver = shape_key.driver_add('value').driver
                 driver.type = 'SCRIPTED'
-                var_main = driver.variables.new()
-                var_main.name = 'coord'
-                var_main.targets[0].id = armature_obj
-                var_main.targets[0].data_path = f'pose.bones["Mouth"].location.{info["axis"]}'
+                make_bone_var(driver, 'coord', armature_obj,
+                              f'pose.bones["Mouth"].location.{axis}')
                 var_o = driver.variables.new()
                 var_o.name = 'oval'
-                var_o.targets[0].id_type = 'KEY'
-                var_o.targets[0].id = CharacterMesh.data.shape_keys
-                var_o.targets[0].data_path = 'key_blocks["O"].value'
-                if shape_key_name in ["E", "I"]:
-                    var_y = driver.variables.new()
-                    var_y.name = 'yval'
-                    var_y.targets[0].id = armature_obj
-                    var_y.targets[0].data_path = 'pose.bones["Mouth"].location.y'
-                    driver.expression = (
-                        f"(1 - oval * 0.6) * "
-                        f"(1 - min(abs(yval) / 0.02, 1)) * "
-                        f"max(min(({info['direction']} * coord) / {info['max_value']}, 1), 0)"
-                    )
-                else:
-                    driver.expression = (
-                        f"(1 - oval * 0.6) * "
-                        f"max(min(({info['direction']} * coord) / {info['max_value']}, 1), 0)"
-                    )
-            o_shape = CharacterMesh.data.shape_keys.key_blocks.get("O")
+                target = var_o.targets[0]
+                target.id_type = 'KEY'
+                target.id = shape_keys
+                target.data_path = 'key_blocks["O"].value'
+                if axis == "x":
+                    make_bone_var(driver, 'yval', armature_obj,
+                                  'pose.bones["Mouth"].location.y')
+                driver.expression = expression
+            o_shape = key_blocks.get("O")
             if o_shape:
                 driver = o_shape.driver_add('value').driver
                 driver.type = 'SCRIPTED'
                 for axis in ["x", "y", "z"]:
-                    var = driver.variables.new()
-                    var.name = f"s_{axis}"
-                    var.targets[0].id = armature_obj
-                    var.targets[0].data_path = f'pose.bones["Mouth"].scale.{axis}'
-                driver.expression = (
-                    "max(min(((abs(s_x) + abs(s_y) + abs(s_z)) / 3 - 1) / 0.5, 1), 0)"
-                )
-        shape_map = {
-            "M_OpenSmall": "M_OpenSmall",
-            "M_Laugh": "M_Laugh",
-            "M_Scared": "M_Scared",
-            "M_ScaredTooth": "M_ScaredTooth",
-            "M_Anger": "M_Anger",
-            "M_Trapezoid": "M_Trapezoid",
-            "M_Nutcracker": "M_Nutcracker",
-            "Aa": "Aa",
-            "M_A": "M_A",
-            "M_O": "M_O",
-        }
-        for bone_name, shape_name in shape_map.items():
-            shape_key = CharacterMesh.data.shape_keys.key_blocks.get(
-                shape_name)
+                    make_bone_var(driver, f"s_{axis}", armature_obj,
+                                  f'pose.bones["Mouth"].scale.{axis}')
+                driver.expression = O_SHAPE_EXPRESSION
+        for shape_key_name, expression in EYEBROW_Y_EXPRESSIONS.items():
+            shape_key = key_blocks.get(shape_key_name)
             if not shape_key:
                 continue
             driver = shape_key.driver_add('value').driver
             driver.type = 'SCRIPTED'
-            var = driver.variables.new()
-            var.name = 'yval'
-            var.targets[0].id = armature_obj
-            var.targets[0].data_path = f'pose.bones["{bone_name}"].location.y'
-            driver.expression = "max(min(yval / 0.02, 1), 0)"
-        bone_name = "Eyebrows"
-        y_mappings = {
-            "B_Up_Add": {"direction": 1, "shape_key": "B_Up_Add"},
-            "B_Down_Add": {"direction": -1, "shape_key": "B_Down_Add"},
-        }
-        for key, data in y_mappings.items():
-            shape_key = CharacterMesh.data.shape_keys.key_blocks.get(
-                data["shape_key"])
+            make_bone_var(driver, 'yval', armature_obj,
+                          'pose.bones["Eyebrows"].location.y')
+            driver.expression = expression
+        for shape_key_name, expression in EYEBROW_Z_EXPRESSIONS.items():
+            shape_key = key_blocks.get(shape_key_name)
             if not shape_key:
                 continue
             driver = shape_key.driver_add('value').driver
             driver.type = 'SCRIPTED'
-            var = driver.variables.new()
-            var.name = 'yval'
-            var.targets[0].id = armature_obj
-            var.targets[0].data_path = f'pose.bones["{bone_name}"].location.y'
-            dir = data["direction"]
-            driver.expression = f"max(min(({dir} * yval) / 0.01, 1), 0)"
-        z_mappings = {
-            "B_AH_L": {"direction": -1, "angle_deg": 10},
-            "B_AH_R": {"direction": 1, "angle_deg": 10}
-        }
-        for key, info in z_mappings.items():
-            shape_key = CharacterMesh.data.shape_keys.key_blocks.get(key)
-            if not shape_key:
-                continue
-            driver = shape_key.driver_add('value').driver
-            driver.type = 'SCRIPTED'
-            var = driver.variables.new()
-            var.name = 'zrot'
-            var.targets[0].id = armature_obj
-            var.targets[0].data_path = f'pose.bones["{bone_name}"].rotation_euler.z'
-            max_radians = math.radians(info["angle_deg"])
-            direction = info["direction"]
-            driver.expression = f"max(min(({direction} * zrot) / {max_radians:.5f}, 1), 0)"
+            make_bone_var(driver, 'zrot', armature_obj,
+                          'pose.bones["Eyebrows"].rotation_euler.z')
+            driver.expression = expression
 
         # Pupil movement drivers (recreate from rigify.py logic)
-        pupil_shape_key_names = {
-            "Pupil_L": "LOC_X", "Pupil_R": "LOC_X",
-            "Pupil_Up": "LOC_Y", "Pupil_Down": "LOC_Y"
-        }
-        pupil_expressions = {
-            "Pupil_L": 'max(min((bone_x * 10), 1), 0) if bone_x > 0 else 0',
-            "Pupil_R": 'max(min((-bone_x * 10), 1), 0) if bone_x < 0 else 0',
-            "Pupil_Up": 'max(min((bone_y * 10), 1), 0) if bone_y > 0 else 0',
-            "Pupil_Down": 'max(min((-bone_y * 10), 1), 0) if bone_y < 0 else 0'
-        }
-        
         # Main EyeTracker drivers
-        if CharacterMesh.data.shape_keys and "EyeTracker" in armature_obj.pose.bones:
-            for shape_key_name, transform_axis in pupil_shape_key_names.items():
-                shape_key = CharacterMesh.data.shape_keys.key_blocks.get(shape_key_name)
+        if "EyeTracker" in pose_bone_names:
+            for shape_key_name, transform_axis in PUPIL_SHAPE_KEYS.items():
+                shape_key = key_blocks.get(shape_key_name)
                 if shape_key:
                     # Remove existing driver if any
                     shape_key.driver_remove('value')
                     driver = shape_key.driver_add('value').driver
                     driver.type = 'SCRIPTED'
-                    var = driver.variables.new()
-                    var.name = 'bone_' + transform_axis[-1].lower()
-                    var.type = 'TRANSFORMS'
-                    var.targets[0].id = armature_obj
-                    var.targets[0].bone_target = "EyeTracker"
-                    var.targets[0].transform_type = transform_axis
-                    var.targets[0].transform_space = 'LOCAL_SPACE'
-                    driver.expression = pupil_expressions[shape_key_name]
+                    make_transform_var(
+                        driver, 'bone_' + transform_axis[-1].lower(), armature_obj,
+                        "EyeTracker", transform_axis)
+                    driver.expression = PUPIL_EXPRESSIONS[shape_key_name]
         
         # Per-eye drivers (Eye.L / Eye.R)
-        if CharacterMesh.data.shape_keys:
-            for bone_suffix in ['.L', '.R']:
-                bone_name = "Eye" + bone_suffix
-                if bone_name not in armature_obj.pose.bones:
-                    continue
-                for shape_key_prefix, transform_axis in pupil_shape_key_names.items():
-                    shape_key_name = shape_key_prefix + bone_suffix
-                    shape_key = CharacterMesh.data.shape_keys.key_blocks.get(shape_key_name)
-                    if shape_key:
-                        # Remove existing driver if any
-                        shape_key.driver_remove('value')
-                        driver = shape_key.driver_add('value').driver
-                        driver.type = 'SCRIPTED'
-                        var = driver.variables.new()
-                        var.name = 'bone_' + transform_axis[-1].lower()
-                        var.type = 'TRANSFORMS'
-                        var.targets[0].id = armature_obj
-                        var.targets[0].bone_target = bone_name
-                        var.targets[0].transform_type = transform_axis
-                        var.targets[0].transform_space = 'LOCAL_SPACE'
-                        driver.expression = pupil_expressions[shape_key_prefix]
+        for bone_suffix in ['.L', '.R']:
+            bone_name = "Eye" + bone_suffix
+            if bone_name not in pose_bone_names:
+                continue
+            for shape_key_prefix, transform_axis in PUPIL_SHAPE_KEYS.items():
+                shape_key_name = shape_key_prefix + bone_suffix
+                shape_key = key_blocks.get(shape_key_name)
+                if shape_key:
+                    # Remove existing driver if any
+                    shape_key.driver_remove('value')
+                    driver = shape_key.driver_add('value').driver
+                    driver.type = 'SCRIPTED'
+                    make_transform_var(
+                        driver, 'bone_' + transform_axis[-1].lower(), armature_obj,
+                        bone_name, transform_axis)
+                    driver.expression = PUPIL_EXPRESSIONS[shape_key_prefix]
 
     def execute(self, context):
         initial_active_object = context.active_object
-        initial_selected_objects = context.selected_objects[:]
+        initial_selected_objects = set(context.selected_objects)
         obj = context.active_object
         if obj.type == 'MESH':
             for mod in obj.modifiers:
@@ -582,15 +441,17 @@ class WW_OT_CreateFacePanel(bpy.types.Operator):
             self.report(
                 {'ERROR'}, "Please use the Rigify function for the armature to continue.")
             return {'CANCELLED'}
-        CharacterMesh = None
-        for obj in bpy.data.objects:
-            if obj.type == 'MESH':
-                for mod in obj.modifiers:
-                    if mod.type == 'ARMATURE' and mod.object == armature_obj:
-                        CharacterMesh = obj
-                        break
-                if CharacterMesh:
-                    break
+        # Alphabetical like bpy.data.objects, but only over objects in the scene
+        CharacterMesh = min(
+            (
+                obj for obj in context.scene.objects
+                if obj.type == 'MESH' and any(
+                    mod.type == 'ARMATURE' and mod.object == armature_obj
+                    for mod in obj.modifiers)
+            ),
+            key=lambda obj: obj.name,
+            default=None,
+        )
         if not CharacterMesh:
             self.report(
                 {'ERROR'}, "No mesh found with an Armature modifier using the selected armature.")
@@ -622,23 +483,19 @@ class WW_OT_CreateFacePanel(bpy.types.Operator):
                 eye_tracker_pos = eye_tracker_bone.head.copy()
                 face_panel_root = edit_bones.new("FacePanelRoot")
                 face_panel_root.head = eye_tracker_pos
-                face_panel_root.tail = eye_tracker_pos + \
-                    mathutils.Vector((0.0, 0.0, 0.02))
+                face_panel_root.tail = eye_tracker_pos + BONE_Z_002
                 face_panel_root.use_connect = False
                 parent_bone = edit_bones.get("ORG-head")
                 if parent_bone:
                     face_panel_root.parent = parent_bone
                 face_panel = edit_bones.new("FacePanel")
                 face_panel.head = eye_tracker_pos
-                face_panel.tail = eye_tracker_pos + \
-                    mathutils.Vector((0.0, 0.0, 0.01))
+                face_panel.tail = eye_tracker_pos + BONE_Z_001
                 face_panel.use_connect = False
                 face_panel.parent = face_panel_root
                 eye_scale = edit_bones.new("EyeScale")
-                eye_scale.head = face_panel.head - \
-                    mathutils.Vector((0.0, 0.0, 0.01))
-                eye_scale.tail = eye_scale.head + \
-                    mathutils.Vector((0.0, 0.0, 0.01))
+                eye_scale.head = face_panel.head - BONE_Z_001
+                eye_scale.tail = eye_scale.head + BONE_Z_001
                 eye_scale.use_connect = False
                 eye_scale.parent = face_panel
                 for bone_name in ["Eye.L", "Eye.R"]:
@@ -646,16 +503,6 @@ class WW_OT_CreateFacePanel(bpy.types.Operator):
                     if bone:
                         bone.parent = face_panel
                 eye_tracker_bone.parent = face_panel_root
-                bpy.ops.object.mode_set(mode='OBJECT')
-                pose_bones = armature_obj.pose.bones
-                if "FacePanel" in pose_bones and "EyeTracker" in pose_bones:
-                    face_panel_pose = pose_bones["FacePanel"]
-                    constraint = face_panel_pose.constraints.new(
-                        type='COPY_LOCATION')
-                    constraint.name = "FollowEyeTracker"
-                    constraint.target = armature_obj
-                    constraint.subtarget = "EyeTracker"
-                bpy.ops.object.mode_set(mode='EDIT')
 
                 def create_fan_bones(base_bone_name, custom_bone_names, side_suffix):
                     base_bone = edit_bones.get(base_bone_name)
@@ -667,23 +514,21 @@ class WW_OT_CreateFacePanel(bpy.types.Operator):
                     bone_length = 0.02
                     num_bones = len(custom_bone_names)
                     arc_angle = math.radians(120)
-                    angle_start = -arc_angle / 2
-                    for i in range(num_bones):
-                        angle = angle_start + i * (arc_angle / (num_bones - 1))
-                        direction_multiplier = -1 if side_suffix == ".R" else 1
-                        head_x = math.cos(angle) * radius * \
-                            direction_multiplier
-                        head_z = math.sin(angle) * radius
-                        head = fan_center + \
-                            mathutils.Vector((head_x, 0, head_z))
-                        tail = head + \
-                            (head - fan_center).normalized() * bone_length
-                        bone_name = custom_bone_names[i].replace(
-                            ".L", side_suffix)
-                        fan_bone = edit_bones.new(bone_name)
-                        fan_bone.head = head
-                        fan_bone.tail = tail
-                        fan_bone.parent = edit_bones["FacePanel"]
+                    direction_multiplier = -1 if side_suffix == ".R" else 1
+                    angles = np.linspace(-arc_angle / 2, arc_angle / 2, num_bones)
+                    directions = np.column_stack((
+                        np.cos(angles) * direction_multiplier,
+                        np.zeros(num_bones),
+                        np.sin(angles),
+                    ))
+                    head_offsets = (directions * radius).tolist()
+                    tail_offsets = (directions * (radius + bone_length)).tolist()
+                    for bone_name, head_offset, tail_offset in zip(custom_bone_names, head_offsets, tail_offsets):
+                        fan_bone = edit_bones.new(
+                            bone_name.replace(".L", side_suffix))
+                        fan_bone.head = fan_center + mathutils.Vector(head_offset)
+                        fan_bone.tail = fan_center + mathutils.Vector(tail_offset)
+                        fan_bone.parent = face_panel
                         fan_bone.use_connect = False
 
                 def adjust_bone_roll():
@@ -695,12 +540,13 @@ class WW_OT_CreateFacePanel(bpy.types.Operator):
                         "Insipid.L": 150,
                     }
                     for bone_name, roll_deg in bone_rolls.items():
+                        roll = math.radians(roll_deg)
                         bone = edit_bones.get(bone_name)
                         if bone:
-                            bone.roll = math.radians(roll_deg)
+                            bone.roll = roll
                         bone_R = edit_bones.get(bone_name.replace(".L", ".R"))
                         if bone_R:
-                            bone_R.roll = -math.radians(roll_deg)
+                            bone_R.roll = -roll
                 custom_bone_names_L = ["Insipid.L",
                                        "Focus.L", "Sad.L", "Anger.L", "Smile.L"]
                 custom_bone_names_R = [name.replace(
@@ -708,18 +554,10 @@ class WW_OT_CreateFacePanel(bpy.types.Operator):
                 create_fan_bones("Eye.L", custom_bone_names_L, ".L")
                 create_fan_bones("Eye.R", custom_bone_names_R, ".R")
                 adjust_bone_roll()
-                bpy.ops.object.mode_set(mode='OBJECT')
-                bpy.ops.object.mode_set(mode='EDIT')
-                edit_bones = bpy.context.object.data.edit_bones
-                face_panel = edit_bones.get("FacePanel")
-                if not face_panel:
-                    raise Exception("FacePanel bone not found.")
                 eyebrows_bone = edit_bones.new("Eyebrows")
-                eyebrows_head = face_panel.head + \
-                    mathutils.Vector((0, 0, 0.06))
+                eyebrows_head = face_panel.head + EYEBROWS_Z_OFFSET
                 eyebrows_bone.head = eyebrows_head
-                eyebrows_bone.tail = eyebrows_head + \
-                    mathutils.Vector((0, 0, 0.01))
+                eyebrows_bone.tail = eyebrows_head + BONE_Z_001
                 eyebrows_bone.parent = face_panel
                 eyebrows_bone.use_connect = False
                 b_names = ["B_Anger", "B_Happy", "B_Cheerful",
@@ -731,35 +569,31 @@ class WW_OT_CreateFacePanel(bpy.types.Operator):
                 for i, name in enumerate(b_names):
                     b = edit_bones.new(name)
                     head = mathutils.Vector((start_x + i * spacing, y, z))
-                    tail = head + mathutils.Vector((0, 0, 0.02))
+                    tail = head + BONE_Z_002
                     b.head = head
                     b.tail = tail
                     b.parent = eyebrows_bone
                     b.use_connect = False
                 mouth_panel_bone = edit_bones.new("MouthPanel")
-                mouth_panel_head = face_panel.head - \
-                    mathutils.Vector((0, 0, 0.055))
+                mouth_panel_head = face_panel.head - MOUTH_PANEL_Z_OFFSET
                 mouth_panel_bone.head = mouth_panel_head
-                mouth_panel_bone.tail = mouth_panel_head + \
-                    mathutils.Vector((0, 0, 0.01))
+                mouth_panel_bone.tail = mouth_panel_head + BONE_Z_001
                 mouth_panel_bone.parent = face_panel
                 mouth_panel_bone.use_connect = False
                 mouth_bone = edit_bones.new("Mouth")
                 mouth_bone.head = mouth_panel_head
-                mouth_bone.tail = mouth_bone.head + \
-                    mathutils.Vector((0, 0, 0.02))
+                mouth_bone.tail = mouth_bone.head + BONE_Z_002
                 mouth_bone.parent = mouth_panel_bone
                 mouth_bone.use_connect = False
                 offset_x = 0.045
                 y = mouth_bone.head.y
                 z = mouth_bone.head.z
-                length = 0.02
                 for side in [("Mouth.L", offset_x), ("Mouth.R", -offset_x)]:
                     name, x_offset = side
                     b = edit_bones.new(name)
                     head = mathutils.Vector(
                         (mouth_bone.head.x + x_offset, y, z))
-                    tail = head + mathutils.Vector((0, 0, length))
+                    tail = head + BONE_Z_002
                     b.head = head
                     b.tail = tail
                     b.parent = mouth_panel_bone
@@ -775,12 +609,20 @@ class WW_OT_CreateFacePanel(bpy.types.Operator):
                 for i, name in enumerate(expressions):
                     b = edit_bones.new(name)
                     head = mathutils.Vector((start_x + i * spacing, y, z))
-                    tail = head - mathutils.Vector((0, 0, 0.02))
+                    tail = head - BONE_Z_002
                     b.head = head
                     b.tail = tail
                     b.parent = mouth_panel_bone
                     b.use_connect = False
                 bpy.ops.object.mode_set(mode='OBJECT')
+                pose_bones = armature_obj.pose.bones
+                if "FacePanel" in pose_bones and "EyeTracker" in pose_bones:
+                    face_panel_pose = pose_bones["FacePanel"]
+                    constraint = face_panel_pose.constraints.new(
+                        type='COPY_LOCATION')
+                    constraint.name = "FollowEyeTracker"
+                    constraint.target = armature_obj
+                    constraint.subtarget = "EyeTracker"
 
                 def create_outline(name, verts_2d):
                     full_name = f"Custom{name}"
@@ -1095,13 +937,13 @@ class WW_OT_CreateFacePanel(bpy.types.Operator):
                 self.report(
                     {'INFO'}, "Face panel created and drivers set up drivers.")
             bpy.context.view_layer.objects.active = initial_active_object
-            for obj in bpy.data.objects:
+            for obj in context.view_layer.objects:
                 obj.select_set(obj in initial_selected_objects)
             return {'FINISHED'}
         except Exception as e:
             self.report({'ERROR'}, f"Failed to process face panel: {str(e)}")
             bpy.context.view_layer.objects.active = initial_active_object
-            for obj in bpy.data.objects:
+            for obj in context.view_layer.objects:
                 obj.select_set(obj in initial_selected_objects)
             return {'CANCELLED'}
 
@@ -1146,7 +988,7 @@ class WW_OT_ImportFacePanel(Operator, ImportHelper):
             return {"CANCELLED"}
         if selected_obj.type == "ARMATURE":
             armature = selected_obj
-            mesh = self.get_mesh_from_armature(armature)
+            mesh = self.get_mesh_from_armature(context, armature)
             if not mesh:
                 self.report(
                     {"ERROR"}, "No mesh found associated with the selected armature.")
@@ -1302,11 +1144,16 @@ class WW_OT_ImportFacePanel(Operator, ImportHelper):
         context.scene.face_panel_file_path = filepath
         return face_panel, panel_armature
 
-    def get_mesh_from_armature(self, armature):
-        for obj in bpy.data.objects:
-            if obj.type == "MESH" and get_armature_from_modifiers(obj) == armature:
-                return obj
-        return None
+    def get_mesh_from_armature(self, context, armature):
+        # Alphabetical like bpy.data.objects, but only over objects in the scene
+        return min(
+            (
+                obj for obj in context.scene.objects
+                if obj.type == "MESH" and get_armature_from_modifiers(obj) == armature
+            ),
+            key=lambda obj: obj.name,
+            default=None,
+        )
 
     def position_panel(self, panel, armature, head_pos):
         y = 0.0
@@ -1398,13 +1245,7 @@ class WW_OT_ImportFacePanel(Operator, ImportHelper):
         if not shape_key_block or (hasattr(shape_key_block, "driver") and shape_key_block.driver):
             return
         driver = shape_key_block.driver_add("value").driver
-        variable = driver.variables.new()
-        variable.name = "bone"
-        variable.type = "TRANSFORMS"
-        variable.targets[0].id = armature
-        variable.targets[0].bone_target = bone_name
-        variable.targets[0].transform_space = "LOCAL_SPACE"
-        variable.targets[0].transform_type = transform_type
+        make_transform_var(driver, "bone", armature, bone_name, transform_type)
         driver.type = "SCRIPTED"
         driver.expression = expression
 
@@ -1413,19 +1254,7 @@ class WW_OT_ImportFacePanel(Operator, ImportHelper):
         if not shape_key_block or (hasattr(shape_key_block, "driver") and shape_key_block.driver):
             return
         driver = shape_key_block.driver_add("value").driver
-        var1 = driver.variables.new()
-        var1.name = "bone_001"
-        var1.type = "TRANSFORMS"
-        var1.targets[0].id = armature
-        var1.targets[0].bone_target = bone1
-        var1.targets[0].transform_space = "LOCAL_SPACE"
-        var1.targets[0].transform_type = transform_type
-        var2 = driver.variables.new()
-        var2.name = "bone"
-        var2.type = "TRANSFORMS"
-        var2.targets[0].id = armature
-        var2.targets[0].bone_target = bone2
-        var2.targets[0].transform_space = "LOCAL_SPACE"
-        var2.targets[0].transform_type = transform_type
+        make_transform_var(driver, "bone_001", armature, bone1, transform_type)
+        make_transform_var(driver, "bone", armature, bone2, transform_type)
         driver.type = "SCRIPTED"
         driver.expression = expression
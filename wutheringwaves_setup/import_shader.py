@@ -1,4 +1,5 @@
 import bpy
+import json
 import logging
 import os
 import re
@@ -12,6 +13,7 @@ from .utils import (
     logger,
     get_suffix,
     get_armature_from_modifiers,
+    set_child_of_inverse,
     load_image,
     find_texture,
     set_texture,
@@ -28,9 +30,18 @@ from .utils import (
     make_texture_patterns,
     apply_textures,
     extract_character_name,
+    bucket_nodes,
+    index_original_materials,
+    WW_MATERIAL_RE,
 )
 
 
+_STAR_RE = re.compile(r"MI_(\d)XingStar")
+_WW_BASE_RE = re.compile(r"WW - ([A-Za-z]+)")
+
+_OUTLINE_INPUT_PAIRS = ((10, 5), (11, 9), (14, 15), (18, 19), (24, 25), (27, 26), (28, 29))
+
+
 def init_scene():
     if not bpy.context.scene.is_first_use:
         return
@@ -59,32 +70,34 @@ def init_scene():
 
 def import_node_groups(path: str):
     node_trees = ["Light Vectors", "WW - Outlines", "ResonatorStar Move"]
-    objects = {
-        "Light Direction": False,
-        "Head Origin": False,
-        "Head Forward": False,
-        "Head Up": False,
-        "Circle": False,
-    }
-
-    for name in node_trees:
-        try:
-            bpy.ops.wm.append(filename=name, directory=f"{path}/NodeTree")
-            logger.info(f"Imported node tree: {name}")
-        except Exception as e:
-            logger.warning(f"Failed to append node tree {name}: {str(e)}")
+    objects = ["Light Direction", "Head Origin", "Head Forward", "Head Up", "Circle"]
 
-    for obj_name in objects.keys():
-        if not bpy.data.objects.get(obj_name):
-            try:
-                bpy.ops.wm.append(filename=obj_name,
-                                  directory=f"{path}/Object")
-                if obj_name == "Circle" and (circle := bpy.data.objects.get("Circle")):
-                    circle.hide_viewport = True
-                    circle.hide_render = True
-                logger.info(f"Imported object: {obj_name}")
-            except Exception as e:
-                logger.warning(f"Failed to append object {obj_name}: {str(e)}")
+    try:
+        with bpy.data.libraries.load(path, link=False) as (data_from, data_to):
+            data_to.node_groups = [
+                name for name in node_trees if name in data_from.node_groups
+            ]
+            data_to.objects = [
+                name
+                for name in objects
+                if name in data_from.objects and not bpy.data.objects.get(name)
+            ]
+    except Exception as e:
+        logger.warning(f"Failed to load node groups from {path}: {str(e)}")
+        return
+
+    for group in data_to.node_groups:
+        if group:
+            logger.debug("Imported node tree: %s", group.name)
+
+    for obj in data_to.objects:
+        if not obj:
+            continue
+        bpy.context.collection.objects.link(obj)
+        if obj.name == "Circle":
+            obj.hide_viewport = True
+            obj.hide_render = True
+        logger.debug("Imported object: %s", obj.name)
 
 
 def init_modifiers():
@@ -93,57 +106,58 @@ def init_modifiers():
         return
 
     mesh_name = ctx.active_object.name.split(".")[0]
-    suffix = get_suffix()
-    setup_controls(ctx, mesh_name, suffix)
-    set_modifiers(ctx, mesh_name, suffix)
-    add_head_lock(mesh_name)
-    apply_head_lock()
+    objects = {obj.name: obj for obj in bpy.data.objects}
+    suffix = get_suffix(objects.values())
+    setup_controls(ctx, mesh_name, suffix, objects)
+    set_modifiers(ctx, mesh_name, suffix, objects)
+    add_head_lock(mesh_name, suffix, objects)
+    apply_head_lock(suffix, objects)
     logger.info(f"Initialized modifiers for {mesh_name}")
 
 
-def setup_controls(ctx, mesh_name: str, suffix: str):
+def setup_controls(ctx, mesh_name: str, suffix: str, objects: Dict[str, Any]):
     control_objects = ["Light Direction",
                        "Head Origin", "Head Forward", "Head Up"]
-    need_new = any(
-        obj_name + suffix not in bpy.data.objects for obj_name in control_objects
-    )
+    need_new = not all(obj_name + suffix in objects for obj_name in control_objects)
 
     if need_new:
         for obj_name in control_objects:
             if (
-                obj_name + suffix not in bpy.data.objects
-                and obj_name in bpy.data.objects
+                obj_name + suffix not in objects
+                and obj_name in objects
             ):
-                orig = bpy.data.objects[obj_name]
-                new_obj = orig.copy()
+                # Object.copy() already carries the transform over.
+                new_obj = objects[obj_name].copy()
                 new_obj.name = obj_name + suffix
-                new_obj.location = orig.location.copy()
-                new_obj.rotation_euler = orig.rotation_euler.copy()
-                new_obj.scale = orig.scale.copy()
                 bpy.context.collection.objects.link(new_obj)
+                objects[new_obj.name] = new_obj
                 logger.info(f"Created control object: {new_obj.name}")
 
-        head_origin = bpy.data.objects.get(f"Head Origin{suffix}")
+        head_origin = objects.get(f"Head Origin{suffix}")
         if head_origin:
             for child_name in ["Head Forward", "Head Up"]:
-                if child := bpy.data.objects.get(f"{child_name}{suffix}"):
+                if child := objects.get(f"{child_name}{suffix}"):
                     child.parent = head_origin
                     child.matrix_parent_inverse = head_origin.matrix_world.inverted()
 
 
-def set_modifiers(ctx, mesh_name: str, suffix: str):
+def set_modifiers(ctx, mesh_name: str, suffix: str, objects: Dict[str, Any]):
     for base_name in ["Light Vectors", "WW - Outlines", "ResonatorStar Move"]:
         if not (group := bpy.data.node_groups.get(base_name)):
             continue
 
         new_group_name = f"{base_name} {mesh_name}"
         new_group = bpy.data.node_groups.get(new_group_name) or group.copy()
-        new_group.name = new_group_name
+        if new_group.name != new_group_name:
+            new_group.name = new_group_name
 
-        modifier = ctx.active_object.modifiers.get(
-            new_group_name
-        ) or ctx.active_object.modifiers.new(new_group_name, "NODES")
-        modifier.node_group = new_group
+        is_new_modifier = not (
+            modifier := ctx.active_object.modifiers.get(new_group_name)
+        )
+        if is_new_modifier:
+            modifier = ctx.active_object.modifiers.new(new_group_name, "NODES")
+        if modifier.node_group != new_group:
+            modifier.node_group = new_group
 
         if base_name == "Light Vectors":
             inputs = {
@@ -153,7 +167,7 @@ def set_modifiers(ctx, mesh_name: str, suffix: str):
                 "Input_6": f"Head Up{suffix}",
             }
             for input_name, obj_name in inputs.items():
-                if obj := bpy.data.objects.get(obj_name):
+                if obj := objects.get(obj_name):
                     modifier[input_name] = obj
 
         elif base_name == "WW - Outlines":
@@ -162,7 +176,8 @@ def set_modifiers(ctx, mesh_name: str, suffix: str):
                 bpy.data.materials.get(outline_mat_name)
                 or bpy.data.materials.get("WW - Outlines").copy()
             )
-            outline_mat.name = outline_mat_name
+            if outline_mat.name != outline_mat_name:
+                outline_mat.name = outline_mat_name
 
             modifier["Input_3_use_attribute"] = True
             modifier["Input_3_attribute_name"] = "COL0"
@@ -175,24 +190,16 @@ def set_modifiers(ctx, mesh_name: str, suffix: str):
                 and slot.material.name.startswith("WW - ")
                 and not any(ex in slot.material.name for ex in ["Eye", "ResonatorStar"])
             ]
-            input_pairs = [
-                (10, 5),
-                (11, 9),
-                (14, 15),
-                (18, 19),
-                (24, 25),
-                (27, 26),
-                (28, 29),
-            ]
-            for i, (mask, mat) in enumerate(input_pairs):
-                modifier[f"Input_{mask}"] = materials[i] if i < len(
-                    materials) else None
-                modifier[f"Input_{mat}"] = outline_mat if i < len(
-                    materials) else None
+            # A fresh modifier has every slot empty already.
+            if materials or not is_new_modifier:
+                for i, (mask, mat) in enumerate(_OUTLINE_INPUT_PAIRS):
+                    used = i < len(materials)
+                    modifier[f"Input_{mask}"] = materials[i] if used else None
+                    modifier[f"Input_{mat}"] = outline_mat if used else None
             modifier.show_viewport = ctx.scene.outlines_enabled
 
         elif base_name == "ResonatorStar Move":
-            if circle := bpy.data.objects.get("Circle"):
+            if circle := objects.get("Circle"):
                 modifier["Input_2"] = circle
             modifier["Output_3_attribute_name"] = "move"
 
@@ -202,10 +209,9 @@ def set_modifiers(ctx, mesh_name: str, suffix: str):
         logger.info(f"Set up {base_name} modifier for {mesh_name}")
 
 
-def add_head_lock(mesh_name: str):
-    suffix = get_suffix()
-    head_origin = bpy.data.objects.get(f"Head Origin{suffix}")
-    mesh = bpy.data.objects.get(mesh_name)
+def add_head_lock(mesh_name: str, suffix: str, objects: Dict[str, Any]):
+    head_origin = objects.get(f"Head Origin{suffix}")
+    mesh = objects.get(mesh_name)
     armature = get_armature_from_modifiers(mesh) if mesh else None
     if not head_origin or not armature:
         return
@@ -227,52 +233,24 @@ def add_head_lock(mesh_name: str):
     head_origin_local = bone_head_local + relative_position
     head_origin.location = head_origin_local
 
-    for const in head_origin.constraints:
-        head_origin.constraints.remove(const)
+    head_origin.constraints.clear()
 
     constraint = head_origin.constraints.new("CHILD_OF")
     constraint.target = armature
     constraint.subtarget = head_bone
+    set_child_of_inverse(constraint)
+    logger.info(f"Applied head lock with relative position for {head_origin.name}")
 
-    bpy.context.view_layer.objects.active = head_origin
-    bpy.ops.object.select_all(action="DESELECT")
-    head_origin.select_set(True)
-    context_override = bpy.context.copy()
-    context_override["constraint"] = constraint
-    try:
-        bpy.ops.constraint.childof_set_inverse(
-            context_override, constraint=constraint.name, owner="OBJECT"
-        )
-        logger.info(
-            f"Applied head lock with relative position for {head_origin.name}")
-    except Exception as e:
-        logger.warning(f"Failed to set inverse for child constraint: {str(e)}")
-    head_origin.select_set(False)
-
-
-def apply_head_lock():
-    suffix = get_suffix()
-    if head_origin := bpy.data.objects.get(f"Head Origin{suffix}"):
-        bpy.ops.object.select_all(action="DESELECT")
-        head_origin.select_set(True)
-        bpy.context.view_layer.objects.active = head_origin
 
+def apply_head_lock(suffix: str, objects: Dict[str, Any]):
+    if head_origin := objects.get(f"Head Origin{suffix}"):
         for constraint in head_origin.constraints:
             if constraint.type == "CHILD_OF":
-                context_override = bpy.context.copy()
-                context_override["constraint"] = constraint
-                try:
-                    bpy.ops.constraint.childof_set_inverse(
-                        context_override, constraint=constraint.name, owner="OBJECT"
-                    )
+                if constraint.target:
+                    set_child_of_inverse(constraint)
                     logger.info(
                         f"Applied head lock inverse for {head_origin.name}")
-                except Exception as e:
-                    logger.warning(
-                        f"Failed to set inverse for child constraint: {str(e)}"
-                    )
                 break
-        head_origin.select_set(False)
 
 
 def set_star_shader(material: bpy.types.Material, mat_name: str, stars: Dict[str, int]):
@@ -289,11 +267,14 @@ def set_star_shader(material: bpy.types.Material, mat_name: str, stars: Dict[str
                         star_value = stars[mat_name]
                         input.default_value = {
                             4: 0, 5: 1, 6: 2}.get(star_value, 0)
-                        logger.info(
-                            f"Set star value to {input.default_value} for {mat_name}"
+                        logger.debug(
+                            "Set star value to %s for %s", input.default_value, mat_name
                         )
 
 
+def _slot_mat_name(slot):
+    material = slot.material
+    return material.name if material else None
 
 
 class WW_OT_ImportShader(Operator, ImportHelper):
@@ -341,22 +322,15 @@ class WW_OT_ImportShader(Operator, ImportHelper):
             else:
                 self.filepath = context.scene.shader_file_path
                 logger.info(f"Using existing shader file: {self.filepath}")
-                existing_materials = {mat.name for mat in bpy.data.materials}
-                with bpy.data.libraries.load(self.filepath) as (data_from, data_to):
-                    data_to.materials = [
-                        mat_name
-                        for mat_name in data_from.materials
-                        if mat_name.startswith("WW - ")
-                        and mat_name not in existing_materials
-                    ]
-                logger.info(
-                    f"Loaded {len(data_to.materials)} additional shader materials"
-                )
+                loaded_count = self._load_ww_materials(self.filepath)
+                logger.info(f"Loaded {loaded_count} additional shader materials")
                 import_node_groups(self.filepath)
                 logger.info("Node groups imported")
 
             self.process_materials(context)
-            context.scene.original_materials = str(orig_mats)
+            context.scene.original_materials = json.dumps(
+                orig_mats, separators=(",", ":")
+            )
             logger.info("Original materials saved to scene")
             darken_eye_colors(context.active_object)
             logger.info("Eye colors adjusted")
@@ -372,19 +346,17 @@ class WW_OT_ImportShader(Operator, ImportHelper):
             logger.info(
                 f"Mesh {mesh_name} already has WW shaders. Checking existing setup."
             )
-            shader_count = 0
-            material_types = set()
-            for slot in active_obj.material_slots:
-                if slot.material and slot.material.name.startswith("WW - "):
-                    shader_count += 1
-                    if match := re.search(r"WW - ([A-Za-z]+)", slot.material.name):
-                        material_types.add(match.group(1))
-
-            logger.info(f"Found {shader_count} WW shaders on {mesh_name}")
-            logger.info(
-                f"Material types detected: {', '.join(material_types)}")
-            logger.info(
-                f"Skipping shader import, will proceed to texture import")
+            ww_slots = self.get_ww_slots(context)
+            shader_count = len(ww_slots)
+            material_types = {
+                match.group(1)
+                for _slot, mat_name in ww_slots
+                if (match := _WW_BASE_RE.search(mat_name))
+            }
+
+            logger.info("Found %d WW shaders on %s", shader_count, mesh_name)
+            logger.info("Material types detected: %s", ", ".join(material_types))
+            logger.info("Skipping shader import, will proceed to texture import")
             self.report(
                 {"INFO"},
                 f"Mesh {mesh_name} already has shaders. Proceeding to texture import.",
@@ -395,12 +367,20 @@ class WW_OT_ImportShader(Operator, ImportHelper):
 
         return {"FINISHED"}
 
+    def get_ww_slots(self, context):
+        return [
+            (slot, slot.material.name)
+            for slot in context.active_object.material_slots
+            if slot.material and slot.material.name.startswith("WW - ")
+        ]
+
     def check_if_has_shader(self, context):
-        active_obj = context.active_object
-        for slot in active_obj.material_slots:
-            if slot.material and slot.material.name.startswith("WW - "):
-                return True
-        return False
+        # Stop at the first WW - slot; the full list is only built when
+        # the existing-shader branch needs it.
+        return any(
+            slot.material and slot.material.name.startswith("WW - ")
+            for slot in context.active_object.material_slots
+        )
 
     def validate_context(self, context):
         if not context.active_object or context.active_object.type != "MESH":
@@ -418,25 +398,28 @@ class WW_OT_ImportShader(Operator, ImportHelper):
 
     def get_original_materials(self):
         return {
-            obj.name: [
-                (slot.material.name if slot.material else None)
-                for slot in obj.material_slots
-            ]
+            obj.name: [_slot_mat_name(slot) for slot in obj.material_slots]
             for obj in bpy.data.objects
             if obj.type == "MESH"
         }
 
+    def _load_ww_materials(self, filepath: str) -> int:
+        existing_materials = {
+            mat.name for mat in bpy.data.materials if mat.name.startswith("WW - ")
+        }
+        with bpy.data.libraries.load(filepath) as (data_from, data_to):
+            data_to.materials = [
+                mat_name
+                for mat_name in data_from.materials
+                if mat_name.startswith("WW - ")
+                and mat_name not in existing_materials
+            ]
+        return len(data_to.materials)
+
     def import_materials(self, context):
-        existing_materials = {mat.name for mat in bpy.data.materials}
         try:
-            with bpy.data.libraries.load(self.filepath) as (data_from, data_to):
-                data_to.materials = [
-                    mat_name
-                    for mat_name in data_from.materials
-                    if mat_name.startswith("WW - ")
-                    and mat_name not in existing_materials
-                ]
-            logger.info(f"Imported {len(data_to.materials)} shader materials")
+            loaded_count = self._load_ww_materials(self.filepath)
+            logger.info(f"Imported {loaded_count} shader materials")
             import_node_groups(self.filepath)
             init_scene()
             return True
@@ -482,7 +465,7 @@ class WW_OT_ImportShader(Operator, ImportHelper):
         self, mat_name: str, mat_map: Dict[str, str], stars: Dict[str, int]
     ):
         if "XingStar" in mat_name:
-            if match := re.match(r"MI_(\d)XingStar", mat_name):
+            if match := _STAR_RE.match(mat_name):
                 stars[mat_name] = int(match.group(1))
                 return "WW - ResonatorStar"
         else:
@@ -497,7 +480,7 @@ class WW_OT_ImportShader(Operator, ImportHelper):
 
         if shader_name in bpy.data.materials:
             material = bpy.data.materials[shader_name].copy()
-        elif base_match := re.match(r"WW - ([A-Za-z]+)", shader_name):
+        elif base_match := _WW_BASE_RE.match(shader_name):
             base_name = base_match.group(0)
             material = bpy.data.materials.get(
                 base_name, bpy.data.materials.get("WW - Main")
@@ -537,99 +520,102 @@ class WW_OT_ImportTextures(Operator, ImportHelper):
         mesh_name = active_obj.name.split(".")[0]
         logger.info(f"Starting texture import for {mesh_name}")
 
-        self.clear_existing_textures(context)
-
         self.import_textures(context)
 
         data = get_mesh_data(context, mesh_name)
-        self.assign_textures(context)
+        self._mi_index = index_original_materials(active_obj.material_slots)
+        logger.info(
+            f"Assigning textures to {mesh_name} with mode: {data.tex_mode}")
 
+        # One walk over the slots and their nodes: clear old images, unmute
+        # hair shadows, apply the new textures and look for HET maps. The
+        # See Through nodes depend on every material, so only collect them.
+        texture_count = 0
         shadow_hair_count = 0
-        for slot in active_obj.material_slots:
-            if (
-                slot.material
-                and slot.material.use_nodes
-                and slot.material.name.startswith("WW - ")
-            ):
-                for node in slot.material.node_tree.nodes:
-                    if (
-                        node.type == "GROUP"
-                        and node.node_tree
-                        and "Shadows for Hair" in node.node_tree.name
-                    ):
-                        node.mute = False
-                        shadow_hair_count += 1
-        if shadow_hair_count > 0:
-            logger.info(
-                f"Unmuted {shadow_hair_count} 'Shadows for Hair' nodes")
-
+        see_through_nodes = []
         has_het_anywhere = False
         assigned_count = 0
         for slot in active_obj.material_slots:
-            if (
-                slot.material
-                and slot.material.use_nodes
-                and (
-                    match := re.search(
-                        r"WW - ([A-Za-z]+)(_?\d+|(?:_[^_]+)*)?", slot.material.name
-                    )
-                )
-            ):
-                base, version = match.group(1), match.group(2) or ""
-                logger.info(
-                    f"Processing material: {slot.material.name} (base: {base}, version: {version})"
+            material = slot.material
+            if not material or not material.use_nodes:
+                continue
+            buckets = bucket_nodes(material)
+            mat_texture_count = 0
+            for node in buckets.tex_images.values():
+                if node.image:
+                    node.image = None
+                    mat_texture_count += 1
+            if material.name.startswith("WW - "):
+                for node in buckets.shadows_for_hair:
+                    node.mute = False
+                shadow_hair_count += len(buckets.shadows_for_hair)
+            see_through_nodes.extend(
+                (material.name, node) for node in buckets.see_through
+            )
+            if mat_texture_count > 0:
+                texture_count += mat_texture_count
+                logger.debug(
+                    "Cleared %d textures from material: %s",
+                    mat_texture_count,
+                    material.name,
                 )
 
-                original_name = self.get_original_material_name(
-                    context, base, version)
-                logger.info(f"Original material name: {original_name}")
-
-                material_info = MaterialDetails(base, version, original_name)
-                mat_tex_data = MaterialTextureData(
-                    slot.material,
-                    material_info,
-                    TEXTURE_TYPE_MAPPINGS,
-                    self.files,
-                    self.directory,
-                    data.tex_mode,
+            if not (match := WW_MATERIAL_RE.search(material.name)):
+                continue
+            base, version = match.group(1), match.group(2) or ""
+            logger.debug(
+                "Processing material: %s (base: %s, version: %s)",
+                material.name,
+                base,
+                version,
+            )
+
+            original_name = self.get_original_material_name(
+                context, base, version)
+            logger.debug("Original material name: %s", original_name)
+
+            material_info = MaterialDetails(base, version, original_name)
+            mat_tex_data = MaterialTextureData(
+                material,
+                material_info,
+                TEXTURE_TYPE_MAPPINGS,
+                self.files,
+                self.directory,
+                data.tex_mode,
+            )
+
+            has_het = apply_textures(mat_tex_data, buckets.tex_images)
+            assigned_count += 1
+            logger.debug("Applied textures to material: %s", material.name)
+
+            if has_het:
+                has_het_anywhere = True
+                logger.debug(
+                    "HET texture detected in material: %s", material.name
                 )
 
-                apply_textures(mat_tex_data)
-                assigned_count += 1
-                logger.info(
-                    f"Applied textures to material: {slot.material.name}")
-
-                if any(
-                    n.image and "_HET" in n.image.name
-                    for n in slot.material.node_tree.nodes
-                    if n.type == "TEX_IMAGE"
-                ):
-                    has_het_anywhere = True
-                    logger.info(
-                        f"HET texture detected in material: {slot.material.name}"
-                    )
+        logger.info(
+            f"Cleared total of {texture_count} existing textures from {active_obj.name}"
+        )
+        if shadow_hair_count > 0:
+            logger.info(
+                f"Unmuted {shadow_hair_count} 'Shadows for Hair' nodes")
 
         logger.info(f"Has HET textures: {has_het_anywhere}")
-        see_through_count = 0
-        for slot in active_obj.material_slots:
-            if slot.material and slot.material.use_nodes:
-                for node in slot.material.node_tree.nodes:
-                    if (
-                        node.type == "GROUP"
-                        and node.node_tree
-                        and "See Through" in node.node_tree.name
-                    ):
-                        old_state = node.mute
-                        node.mute = not has_het_anywhere
-                        see_through_count += 1
-                        if old_state != node.mute:
-                            logger.info(
-                                f"Changed 'See Through' node state in {slot.material.name}: from {old_state} to {not has_het_anywhere}"
-                            )
-
-        if see_through_count > 0:
+        for material_name, node in see_through_nodes:
+            old_state = node.mute
+            node.mute = not has_het_anywhere
+            if old_state != node.mute:
+                logger.debug(
+                    "Changed 'See Through' node state in %s: from %s to %s",
+                    material_name,
+                    old_state,
+                    not has_het_anywhere,
+                )
+
+        if see_through_nodes:
             logger.info(
-                f"Updated {see_through_count} 'See Through' nodes to {not has_het_anywhere} (muted)"
+                f"Updated {len(see_through_nodes)} 'See Through' nodes to {not has_het_anywhere} (muted)"
             )
 
         data.hair_trans = has_het_anywhere
@@ -645,25 +631,6 @@ class WW_OT_ImportTextures(Operator, ImportHelper):
         context.scene.ww_setup_status = "TEXTURES_DONE"
         return {"FINISHED"}
 
-    def clear_existing_textures(self, context):
-        active_obj = context.active_object
-        texture_count = 0
-        for slot in active_obj.material_slots:
-            if slot.material and slot.material.use_nodes:
-                mat_texture_count = 0
-                for node in slot.material.node_tree.nodes:
-                    if node.type == "TEX_IMAGE" and node.image:
-                        node.image = None
-                        mat_texture_count += 1
-                        texture_count += 1
-                if mat_texture_count > 0:
-                    logger.info(
-                        f"Cleared {mat_texture_count} textures from material: {slot.material.name}"
-                    )
-        logger.info(
-            f"Cleared total of {texture_count} existing textures from {active_obj.name}"
-        )
-
     def validate_context(self, context):
         if not context.active_object or context.active_object.type != "MESH":
             self.report(
@@ -683,63 +650,22 @@ class WW_OT_ImportTextures(Operator, ImportHelper):
         imported_files = []
         for file in self.files:
             file_path = os.path.join(self.directory, file.name)
-            logger.info(f"Loading texture: {file.name}")
+            logger.debug("Loading texture: %s", file.name)
             loaded_image = load_image(file_path)
             if loaded_image:
                 imported_files.append(file.name)
             else:
-                logger.warning(f"Failed to load texture: {file.name}")
+                logger.warning("Failed to load texture: %s", file.name)
 
         mesh_name = context.active_object.name.split(".")[0]
         data = get_mesh_data(context, mesh_name)
-        data.textures = ",".join(imported_files)
+        data.textures = texture_list = ",".join(imported_files)
         logger.info(f"Imported {len(imported_files)} textures for {mesh_name}")
-        logger.info(f"Texture list: {data.textures}")
-
-    def assign_textures(self, context):
-        mesh_name = context.active_object.name.split(".")[0]
-        data = get_mesh_data(context, mesh_name)
-        logger.info(
-            f"Assigning textures to {mesh_name} with mode: {data.tex_mode}")
-
-        for slot in context.active_object.material_slots:
-            if (
-                slot.material
-                and slot.material.use_nodes
-                and (
-                    match := re.search(
-                        r"WW - ([A-Za-z]+)(_?\d+|(?:_[^_]+)*)?", slot.material.name
-                    )
-                )
-            ):
-                base, version = match.group(1), match.group(2) or ""
-                logger.info(
-                    f"Processing material: {slot.material.name} (base: {base}, version: {version})"
-                )
-
-                original_name = self.get_original_material_name(
-                    context, base, version)
-                logger.info(f"Original material name: {original_name}")
-
-                material_info = MaterialDetails(base, version, original_name)
-                mat_tex_data = MaterialTextureData(
-                    slot.material,
-                    material_info,
-                    TEXTURE_TYPE_MAPPINGS,
-                    self.files,
-                    self.directory,
-                    data.tex_mode,
-                )
-
-                apply_textures(mat_tex_data)
+        logger.debug("Texture list: %s", texture_list)
 
     def get_original_material_name(self, context, base: str, version: str):
-        return next(
-            (
-                slot.material.name
-                for slot in context.active_object.material_slots
-                if slot.material
-                and re.match(rf"MI_.*?{base}{version}$", slot.material.name)
-            ),
-            None,
-        )
+        if getattr(self, "_mi_index", None) is None:
+            self._mi_index = index_original_materials(
+                context.active_object.material_slots
+            )
+        return self._mi_index.get(base + version)
@@ -2,12 +2,12 @@
 import bpy
 import os
 import math
+import re
 import mathutils
-import bmesh
+import numpy as np
 from bpy.types import Operator
 from mathutils import Vector
-from math import pi, cos, sin
-from collections import defaultdict, deque
+from math import pi
 
 # Here we are inside wuwa_add package.
 from .utils import extract_character_name
@@ -55,24 +55,73 @@ skip_if_finger13 = {
     ("Bip001RFinger4", "Bip001RFinger41"),
 }
 
+all_bone_pairs = tuple(left_bone_pairs + right_bone_pairs)
+bone_pairs_no_finger13 = tuple(
+    pair for pair in all_bone_pairs if pair not in skip_if_finger13
+)
+
+# Bip001 base name -> rigify metarig name; side suffixes are handled by rigify_bone_name
+RIGIFY_NAME_MAPPING = {
+    "Bip001Neck": "neck", "Bip001Head": "head", "Bip001Clavicle": "shoulder",
+    "Bip001UpperArm": "upper_arm", "Bip001Forearm": "forearm", "Bip001Hand": "hand",
+    "Bip001Thigh": "thigh", "Bip001Calf": "shin", "Bip001Foot": "foot", "Bip001Toe0": "toe_ik",
+    "Bip001Spine": "Spine", "Bip001Spine1": "Spine1", "Bip001Spine2": "Spine2", "Bip001Pelvis": "Pelvis",
+    "Bip001Finger0": "thumb.01", "Bip001Finger01": "thumb.02", "Bip001Finger02": "thumb.03",
+}
+
+# Finger mappings depend on whether Finger13 exists
+# For models WITH Finger13: Finger11→01, Finger12→02, Finger13→03
+FINGER13_NAME_MAPPING = {
+    "Bip001Finger11": "f_index.01", "Bip001Finger12": "f_index.02", "Bip001Finger13": "f_index.03",
+    "Bip001Finger21": "f_middle.01", "Bip001Finger22": "f_middle.02", "Bip001Finger23": "f_middle.03",
+    "Bip001Finger31": "f_ring.01", "Bip001Finger32": "f_ring.02", "Bip001Finger33": "f_ring.03",
+    "Bip001Finger41": "f_pinky.01", "Bip001Finger42": "f_pinky.02", "Bip001Finger43": "f_pinky.03",
+}
+# For models WITHOUT Finger13: Finger1→01, Finger11→02, Finger12→03
+FINGER12_NAME_MAPPING = {
+    "Bip001Finger1": "f_index.01", "Bip001Finger11": "f_index.02", "Bip001Finger12": "f_index.03",
+    "Bip001Finger2": "f_middle.01", "Bip001Finger21": "f_middle.02", "Bip001Finger22": "f_middle.03",
+    "Bip001Finger3": "f_ring.01", "Bip001Finger31": "f_ring.02", "Bip001Finger32": "f_ring.03",
+    "Bip001Finger4": "f_pinky.01", "Bip001Finger41": "f_pinky.02", "Bip001Finger42": "f_pinky.03",
+}
+
 # Parameters
 ALIGN_THRESHOLD = math.radians(5)
+# get_local_x returns unit vectors, so "angle < threshold" is "dot > cos".
+COS_ALIGN_THRESHOLD = math.cos(ALIGN_THRESHOLD)
 move_amount = 0.0001
+MAX_ALIGN_ITER = 1000
 NEIGHBOR_DEPTH = 4
 
 
 # --- Helper Functions ---
 
-def get_local_x(bone):
-    return bone.matrix.to_3x3().col[0].normalized()
+_SIDED_BONE_RE = re.compile(r"Bip001([LR])(.*)")
+
+def rigify_bone_name(name, name_mapping):
+    # Bip001LFoo / Bip001LFoo.L -> mapped(Bip001Foo).L; unsided bones only
+    # change when their base name is mapped.
+    if m := _SIDED_BONE_RE.match(name):
+        side, rest = m.groups()
+        suffix = "." + side
+        if rest.endswith(suffix):
+            rest = rest[:-2]
+        base = "Bip001" + rest
+        return name_mapping.get(base, base) + suffix
+    base, suffix = name, ""
+    if name.endswith((".L", ".R")):
+        base, suffix = name[:-2], name[-2:]
+    return name_mapping[base] + suffix if base in name_mapping else name
 
-def angle_between(v1, v2):
-    if v1.length == 0 or v2.length == 0:
-        return math.pi
-    return v1.angle(v2)
+def get_local_x(bone):
+    # EditBone.x_axis is the normalized first column of bone.matrix
+    return bone.x_axis
 
-def all_bone_pairs():
-    return left_bone_pairs + right_bone_pairs
+def set_mode(mode):
+    # mode_set re-evaluates the scene even when nothing changes, so skip no-op switches
+    obj = bpy.context.object
+    if obj is None or obj.mode != mode:
+        bpy.ops.object.mode_set(mode=mode)
 
 def remove_bone_collections(armature):
     if armature.data.collections:
@@ -80,35 +129,47 @@ def remove_bone_collections(armature):
             armature.data.collections.remove(collection)
 
 def process_bone_collections_and_rigify(armature, bone_data):
+    collections = armature.data.collections
+    for collection_name, index, row in bone_data:
+        collections.new(name=collection_name)
+    # The UI row has no data API, so the rigify operator is still needed
     for collection_name, index, row in bone_data:
-        bpy.ops.armature.collection_add()
-        new_collection = armature.data.collections[-1]
-        new_collection.name = collection_name
         bpy.ops.armature.rigify_collection_set_ui_row(index=index, row=row)
 
 def lock_bone_transformations(bone):
-    bone.lock_location[:] = (False, False, False)
-    bone.lock_rotation_w = False
-    bone.lock_rotation[:] = (False, False, False)
-    bone.lock_scale[:] = (False, False, False)
-
-def select_and_move_bones(armature, keyword, collection_index):
-    bpy.ops.pose.select_all(action='DESELECT')
-    selected_bones = []
-    
-    for bone in armature.pose.bones:
-        if keyword in bone.name:
-            selected_bones.append(bone)
-            bone.bone.select = True
-            lock_bone_transformations(bone)
-            
-    if selected_bones:
+    # Locks are off on freshly imported bones; only pay for the writes
+    # when something is actually locked.
+    if any(bone.lock_location):
+        bone.lock_location[:] = (False, False, False)
+    if bone.lock_rotation_w:
+        bone.lock_rotation_w = False
+    if any(bone.lock_rotation):
+        bone.lock_rotation[:] = (False, False, False)
+    if any(bone.lock_scale):
+        bone.lock_scale[:] = (False, False, False)
+
+def move_bones_by_keywords(armature, keywords_and_collections):
+    # Moving bones keyword by keyword leaves every bone in the collection of
+    # the last keyword it contains, so work that out up front and move each
+    # collection's bones with a single operator call.
+    bones = armature.data.bones
+    if not len(bones):
+        return
+    names = np.array(bones.keys(), dtype=str)
+    targets = np.full(len(names), -1)
+    for keyword, collection_index in keywords_and_collections:
+        targets[np.char.find(names, keyword) >= 0] = collection_index
+
+    pose_bones = armature.pose.bones
+    for collection_index in dict.fromkeys(targets[targets >= 0].tolist()):
+        selected = targets == collection_index
+        bones.foreach_set('select', selected)
+        for name in names[selected].tolist():
+            lock_bone_transformations(pose_bones[name])
         try:
             bpy.ops.armature.move_to_collection(collection_index=collection_index)
         except Exception as e:
             print(f"Error moving bones to collection {collection_index}: {e}")
-            
-    return len(selected_bones)
 
 def get_hair_chain_length(bone):
     """Get total length of the Hair bone chain this bone belongs to."""
@@ -163,6 +224,91 @@ def select_and_move_hair_bones(armature, hair1_index, hair2_index):
         except Exception as e:
             print(f"Error moving Hair 2 bones: {e}")
 
+def transfer_vertex_weights(mesh_obj, weight_mappings):
+    vgroups = mesh_obj.vertex_groups
+    pairs = []
+    for source, target in weight_mappings.items():
+        if source in vgroups:
+            src_grp = vgroups[source]
+            if target not in vgroups: tgt_grp = vgroups.new(name=target)
+            else: tgt_grp = vgroups[target]
+            pairs.append((src_grp.index, tgt_grp.index))
+    if not pairs:
+        return
+
+    # Snapshot the involved groups in one pass over the vertices, replay the
+    # mappings in order on the arrays, then write each group back once.
+    involved = {index for pair in pairs for index in pair}
+    vert_ids, group_ids, group_weights = [], [], []
+    for vert in mesh_obj.data.vertices:
+        for g in vert.groups:
+            if g.group in involved:
+                vert_ids.append(vert.index)
+                group_ids.append(g.group)
+                group_weights.append(g.weight)
+    vert_ids = np.asarray(vert_ids, dtype=np.int32)
+    group_ids = np.asarray(group_ids, dtype=np.int32)
+    group_weights = np.asarray(group_weights, dtype=np.float32)
+
+    vert_count = len(mesh_obj.data.vertices)
+    weights = {}
+    members = {}
+    for index in involved:
+        rows = group_ids == index
+        weights[index] = np.zeros(vert_count, np.float32)
+        weights[index][vert_ids[rows]] = group_weights[rows]
+        members[index] = np.zeros(vert_count, bool)
+        members[index][vert_ids[rows]] = True
+
+    removed = {}
+    changed = {}
+    for src, tgt in pairs:
+        mask = members[src]
+        if not mask.any():
+            continue
+        weights[tgt][mask] += weights[src][mask]
+        members[tgt] |= mask
+        changed[tgt] = changed[tgt] | mask if tgt in changed else mask.copy()
+        removed[src] = removed[src] | mask if src in removed else mask.copy()
+        weights[src][mask] = 0.0
+        members[src] = np.zeros(vert_count, bool)
+
+    for tgt, mask in changed.items():
+        indices = np.flatnonzero(mask)
+        values, inverse = np.unique(weights[tgt][indices], return_inverse=True)
+        for k, value in enumerate(values):
+            vgroups[tgt].add(indices[inverse == k].tolist(), float(value), 'REPLACE')
+    for src, mask in removed.items():
+        vgroups[src].remove(np.flatnonzero(mask).tolist())
+
+def add_transform_driver(key_block, rig, bone_name, transform_type, expression):
+    driver = key_block.driver_add('value').driver
+    driver.type = 'SCRIPTED'
+    var = driver.variables[0] if driver.variables else driver.variables.new()
+    var.name = 'bone_' + transform_type[-1].lower()
+    var.type = 'TRANSFORMS'
+    target = var.targets[0]
+    target.id = rig
+    target.bone_target = bone_name
+    target.transform_type = transform_type
+    target.transform_space = 'LOCAL_SPACE'
+    driver.expression = expression
+
+def grow_vertex_region(indptr, indices, seeds, depth, visited):
+    # Breadth-first search one level at a time over a CSR adjacency, marking
+    # every vertex within `depth` steps of the seeds in the `visited` mask.
+    frontier = np.asarray(seeds, dtype=np.int64)
+    visited[frontier] = True
+    for _ in range(depth):
+        if not len(frontier):
+            break
+        starts = indptr[frontier]
+        counts = indptr[frontier + 1] - starts
+        positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        neighbours = np.unique(indices[positions])
+        frontier = neighbours[~visited[neighbours]]
+        visited[frontier] = True
+
 def create_circle_widget(name, radius=0.1, location=(0, 0, 0)):
     if name in bpy.data.objects:
         return bpy.data.objects[name]
@@ -171,45 +317,40 @@ def create_circle_widget(name, radius=0.1, location=(0, 0, 0)):
     obj = bpy.data.objects.new(name, mesh)
     bpy.context.collection.objects.link(obj)
 
-    bm = bmesh.new()
     segments = 32
-    verts = []
-    for i in range(segments):
-        angle = 2 * pi * i / segments
-        x = cos(angle) * radius
-        y = sin(angle) * radius
-        verts.append(bm.verts.new((x, y, 0)))
-    for i in range(segments):
-        bm.edges.new((verts[i], verts[(i + 1) % segments]))
-    bm.to_mesh(mesh)
-    bm.free()
+    angles = 2 * pi * np.arange(segments) / segments
+    verts = np.column_stack(
+        (np.cos(angles) * radius, np.sin(angles) * radius, np.zeros(segments))
+    ).tolist()
+    edges = [(i, (i + 1) % segments) for i in range(segments)]
+    mesh.from_pydata(verts, edges, [])
+    mesh.update()
 
     obj.location = location
     obj.rotation_euler[0] = pi / 2
     obj.name = name
     return obj
 
-def create_capsule_path(bm, radius=0.14, spacing=0.6):
+def create_capsule_path(radius=0.14, spacing=0.6):
     segments = 16
     left_x = -spacing / 2
     right_x = spacing / 2
-    verts = []
+    steps = pi * np.arange(segments + 1) / segments
+    zeros = np.zeros(segments + 1)
 
     # Left semicircle
-    for i in range(segments + 1):
-        angle = pi / 2 + pi * i / segments
-        x = left_x + cos(angle) * radius
-        y = sin(angle) * radius
-        verts.append(bm.verts.new((x, y, 0)))
+    left_angles = pi / 2 + steps
+    left = np.column_stack(
+        (left_x + np.cos(left_angles) * radius, np.sin(left_angles) * radius, zeros)
+    )
 
     # Right semicircle
-    for i in range(segments + 1):
-        angle = -pi / 2 + pi * i / segments
-        x = right_x + cos(angle) * radius
-        y = sin(angle) * radius
-        verts.append(bm.verts.new((x, y, 0)))
+    right_angles = -pi / 2 + steps
+    right = np.column_stack(
+        (right_x + np.cos(right_angles) * radius, np.sin(right_angles) * radius, zeros)
+    )
 
-    return verts
+    return np.vstack((left, right)).tolist()
 
 def create_double_capsule_widget(name, inner_radius=0.14, outer_radius=0.17, spacing=0.6):
     if name in bpy.data.objects:
@@ -218,18 +359,16 @@ def create_double_capsule_widget(name, inner_radius=0.14, outer_radius=0.17, spa
     mesh = bpy.data.meshes.new(name + "_Mesh")
     obj = bpy.data.objects.new(name, mesh)
     bpy.context.collection.objects.link(obj)
-    bm = bmesh.new()
-
-    verts_inner = create_capsule_path(bm, inner_radius, spacing)
-    for i in range(len(verts_inner)):
-        bm.edges.new((verts_inner[i], verts_inner[(i + 1) % len(verts_inner)]))
 
-    verts_outer = create_capsule_path(bm, outer_radius, spacing)
-    for i in range(len(verts_outer)):
-        bm.edges.new((verts_outer[i], verts_outer[(i + 1) % len(verts_outer)]))
-
-    bm.to_mesh(mesh)
-    bm.free()
+    verts = []
+    edges = []
+    for radius in (inner_radius, outer_radius):
+        path = create_capsule_path(radius, spacing)
+        start = len(verts)
+        verts.extend(path)
+        edges.extend((start + i, start + (i + 1) % len(path)) for i in range(len(path)))
+    mesh.from_pydata(verts, edges, [])
+    mesh.update()
 
     obj.rotation_euler[0] = pi / 2
     obj.name = name
@@ -249,78 +388,92 @@ class WW_OT_Rigify(Operator):
             return {'CANCELLED'}
 
         # --------------- Fix Bone Rotation --------------- #
-        bpy.ops.object.mode_set(mode='EDIT')
+        set_mode('EDIT')
         edit_bones = obj.data.edit_bones
         
         finger13_exists_left = "Bip001LFinger13" in edit_bones
         finger13_exists_right = "Bip001RFinger13" in edit_bones
+        alignment_pairs = (
+            bone_pairs_no_finger13
+            if finger13_exists_left or finger13_exists_right
+            else all_bone_pairs
+        )
         
+        # A closed-form nudge isn't practical (each step changes the bone's
+        # own X axis), so keep the iteration but resolve the bones once and
+        # cap the loop.
+        aligned_pairs = [
+            (b1, b2)
+            for name1, name2 in alignment_pairs
+            if (b1 := edit_bones.get(name1)) and (b2 := edit_bones.get(name2))
+        ]
+
+        if "Bip001LFinger13" in edit_bones:
+            outward_names = [
+                "Bip001LFinger11", "Bip001LFinger21", "Bip001LFinger31", "Bip001LFinger41",
+                "Bip001RFinger11", "Bip001RFinger21", "Bip001RFinger31", "Bip001RFinger41"
+            ]
+            inward_names = [
+                "Bip001LFinger13", "Bip001LFinger23", "Bip001LFinger33", "Bip001LFinger43",
+                "Bip001RFinger13", "Bip001RFinger23", "Bip001RFinger33", "Bip001RFinger43"
+            ]
+        else:
+            outward_names = [
+                "Bip001LFinger1", "Bip001LFinger2", "Bip001LFinger3", "Bip001LFinger4",
+                "Bip001RFinger1", "Bip001RFinger2", "Bip001RFinger3", "Bip001RFinger4"
+            ]
+            inward_names = [
+                "Bip001LFinger12", "Bip001LFinger22", "Bip001LFinger32", "Bip001LFinger42",
+                "Bip001RFinger12", "Bip001RFinger22", "Bip001RFinger32", "Bip001RFinger42"
+            ]
+        outward_bones = [bone for name in outward_names if (bone := edit_bones.get(name))]
+        inward_bones = [bone for name in inward_names if (bone := edit_bones.get(name))]
+
         def check_alignment():
-            for name1, name2 in all_bone_pairs():
-                if (finger13_exists_left and (name1, name2) in skip_if_finger13) or \
-                   (finger13_exists_right and (name1, name2) in skip_if_finger13):
-                    continue
-                b1 = edit_bones.get(name1)
-                b2 = edit_bones.get(name2)
-                if b1 and b2:
-                    x1 = get_local_x(b1)
-                    x2 = get_local_x(b2)
-                    angle = angle_between(x1, x2)
-                    if angle < ALIGN_THRESHOLD:
-                        return True
-            return False
+            return any(
+                get_local_x(b1).dot(get_local_x(b2)) > COS_ALIGN_THRESHOLD
+                for b1, b2 in aligned_pairs
+            )
 
         def apply_adjustment():
-            if "Bip001LFinger13" in edit_bones:
-                outward_bones = [
-                    "Bip001LFinger11", "Bip001LFinger21", "Bip001LFinger31", "Bip001LFinger41",
-                    "Bip001RFinger11", "Bip001RFinger21", "Bip001RFinger31", "Bip001RFinger41"
-                ]
-                inward_bones = [
-                    "Bip001LFinger13", "Bip001LFinger23", "Bip001LFinger33", "Bip001LFinger43",
-                    "Bip001RFinger13", "Bip001RFinger23", "Bip001RFinger33", "Bip001RFinger43"
-                ]
-            else:
-                outward_bones = [
-                    "Bip001LFinger1", "Bip001LFinger2", "Bip001LFinger3", "Bip001LFinger4",
-                    "Bip001RFinger1", "Bip001RFinger2", "Bip001RFinger3", "Bip001RFinger4"
-                ]
-                inward_bones = [
-                    "Bip001LFinger12", "Bip001LFinger22", "Bip001LFinger32", "Bip001LFinger42",
-                    "Bip001RFinger12", "Bip001RFinger22", "Bip001RFinger32", "Bip001RFinger42"
-                ]
-
-            for bone_name in outward_bones:
-                bone = edit_bones.get(bone_name)
-                if bone:
-                    x_axis = get_local_x(bone)
-                    bone.tail += x_axis * move_amount
-
-            for bone_name in inward_bones:
-                bone = edit_bones.get(bone_name)
-                if bone:
-                    x_axis = get_local_x(bone)
-                    bone.tail -= x_axis * move_amount
-
-        while check_alignment():
+            for bone in outward_bones:
+                x_axis = get_local_x(bone)
+                bone.tail += x_axis * move_amount
+
+            for bone in inward_bones:
+                x_axis = get_local_x(bone)
+                bone.tail -= x_axis * move_amount
+
+        # Each step moves a tail by move_amount, so allow enough steps to
+        # travel the longest finger bone even before scale is applied.
+        max_align_iter = max(
+            MAX_ALIGN_ITER,
+            math.ceil(max((bone.length for bone in outward_bones + inward_bones), default=0) / move_amount),
+        )
+        for _ in range(max_align_iter):
+            if not check_alignment():
+                break
             apply_adjustment()
+        else:
+            if check_alignment():
+                self.report({'WARNING'}, "Some finger bones are still aligned; finger rolls may be incorrect.")
             
-        bpy.ops.object.mode_set(mode='OBJECT')
+        set_mode('OBJECT')
 
         # --------------- Main Rigify Code --------------- #
         selected_object = context.active_object
         OrigArmature = selected_object.name
         RigArmature = extract_character_name(OrigArmature) + "Rig"
-        CharacterMesh = None
-
-        for o in context.scene.objects:
-            if o.type == 'MESH':
-                for modifier in o.modifiers:
-                    if modifier.type == 'ARMATURE' and modifier.object and modifier.object.name == OrigArmature:
-                        CharacterMesh = o
-                        break
-                if CharacterMesh:
-                    break
+        CharacterMesh = next(
+            (
+                o for o in context.scene.objects
+                if o.type == 'MESH' and any(
+                    modifier.type == 'ARMATURE' and modifier.object == selected_object
+                    for modifier in o.modifiers
+                )
+            ),
+            None,
+        )
         
         # Apply Scale
         try:
@@ -328,10 +481,13 @@ class WW_OT_Rigify(Operator):
         except Exception as e:
             print(f"Failed to apply scale: {e}")
 
-        rig_armature_object = context.view_layer.objects.active
-        if rig_armature_object and rig_armature_object.type == 'ARMATURE':
-            bpy.ops.object.mode_set(mode='EDIT')
-            spine_bone = rig_armature_object.data.edit_bones.get("Bip001Spine2")
+        if context.object and context.object.type == 'ARMATURE':
+            armature = context.object
+            remove_bone_collections(armature)
+
+            set_mode('EDIT')
+
+            spine_bone = armature.data.edit_bones.get("Bip001Spine2")
             if spine_bone:
                  bone_length = (spine_bone.tail - spine_bone.head).length
                  if bone_length < 0.06:
@@ -341,13 +497,6 @@ class WW_OT_Rigify(Operator):
                      spine_bone.tail.y = spine_bone.head.y
                      spine_bone.head.z += 0.03
                      spine_bone.tail.z += 0.03
-            bpy.ops.object.mode_set(mode='OBJECT')
-
-        if context.object and context.object.type == 'ARMATURE':
-            armature = context.object
-            remove_bone_collections(armature)
-
-            bpy.ops.object.mode_set(mode='EDIT')
             
             bone_pairs = [
                 ('Bip001Spine1', 'Bip001Spine2'),
@@ -360,18 +509,16 @@ class WW_OT_Rigify(Operator):
                 ('Bip001RUpperArm', 'Bip001RForearm'),
                 ('Bip001LForearm', 'Bip001LHand'),
                 ('Bip001RForearm', 'Bip001RHand'),
-                ('Bip001LThigh', 'Bip001LCalf'),
-                ('Bip001LCalf', 'Bip001LFoot'),
                 ('Bip001LFoot', 'Bip001LToe0'),
-                ('Bip001RThigh', 'Bip001RCalf'),
-                ('Bip001RCalf', 'Bip001RFoot'),
                 ('Bip001RFoot', 'Bip001RToe0'),
             ]
 
+            # Nothing is added or renamed in this block, so one name map serves it all
+            eb_map = {bone.name: bone for bone in armature.data.edit_bones}
             for bone1_name, bone2_name in bone_pairs:
-                if bone1_name in armature.data.edit_bones and bone2_name in armature.data.edit_bones:
-                    bone1 = armature.data.edit_bones[bone1_name]
-                    bone2 = armature.data.edit_bones[bone2_name]
+                bone1 = eb_map.get(bone1_name)
+                bone2 = eb_map.get(bone2_name)
+                if bone1 and bone2:
                     bone1.tail = bone2.head
 
             twist_bones = {
@@ -379,10 +526,11 @@ class WW_OT_Rigify(Operator):
                 'Bip001LForeTwist': 'Bip001LForearm'
             }
             for twist_bone, correct_parent in twist_bones.items():
-                if twist_bone in armature.data.edit_bones and correct_parent in armature.data.edit_bones:
-                    bone = armature.data.edit_bones[twist_bone]
-                    if bone.parent != armature.data.edit_bones[correct_parent]:
-                         bone.parent = armature.data.edit_bones[correct_parent]
+                bone = eb_map.get(twist_bone)
+                parent = eb_map.get(correct_parent)
+                if bone and parent:
+                    if bone.parent != parent:
+                         bone.parent = parent
 
             spine_bones = [
                 'Bip001Spine', 'Bip001Spine1', 'Bip001Spine2',
@@ -401,19 +549,21 @@ class WW_OT_Rigify(Operator):
                 'Bip001RFinger13', 'Bip001RFinger23', 'Bip001RFinger33', 'Bip001RFinger43',
             ]
             for bone_name in spine_bones:
-                if bone_name in armature.data.edit_bones:
-                    armature.data.edit_bones[bone_name].use_connect = True
+                bone = eb_map.get(bone_name)
+                if bone:
+                    bone.use_connect = True
 
             bones_to_adjust_roll = [
                 'Bip001Pelvis', 'Bip001Spine', 'Bip001Spine1',
                 'Bip001Spine2', 'Bip001LClavicle', 'Bip001RClavicle'
             ]
             for bone_name in bones_to_adjust_roll:
-                if bone_name in armature.data.edit_bones:
-                    armature.data.edit_bones[bone_name].roll = 0
+                bone = eb_map.get(bone_name)
+                if bone:
+                    bone.roll = 0
 
-            bpy.ops.object.mode_set(mode='OBJECT')
-            bpy.ops.object.mode_set(mode='POSE')
+            set_mode('OBJECT')
+            set_mode('POSE')
 
             bone_data = [
                 ('Torso', 0, 1), ('Torso (Tweak)', 1, 2), ('Fingers', 2, 3), ('Fingers (Details)', 3, 4),
@@ -427,13 +577,14 @@ class WW_OT_Rigify(Operator):
             ]
             process_bone_collections_and_rigify(armature, bone_data)
             
-            bpy.ops.armature.collection_add()
-            armature.data.collections[-1].name = 'Others'
+            # collection_add used to make each new collection active, and later
+            # edit_bones.new bones (the heels) join the active one
+            armature.data.collections.active = armature.data.collections.new(name='Others')
             
             for row in [3, 6, 10, 14, 17]:
                 bpy.ops.armature.rigify_collection_add_ui_row(row=row, add=True)
 
-            bpy.ops.object.mode_set(mode='POSE')
+            set_mode('POSE')
             # Hair bones handled separately with chain length logic
             select_and_move_hair_bones(armature, 16, 17)  # Hair 1 = 16, Hair 2 = 17
             
@@ -446,8 +597,7 @@ class WW_OT_Rigify(Operator):
                 ("Bip001Neck.001", 23), ("Bip001Head.001", 23),
                 ("EyeTracker", 0), ("Eye.L", 0), ("Eye.R", 0),
             ]
-            for keyword, collection_index in keywords_and_collections:
-                select_and_move_bones(armature, keyword, collection_index)
+            move_bones_by_keywords(armature, keywords_and_collections)
 
             if "ORG" in armature.data.collections_all:
                 armature.data.collections_all["ORG"].is_visible = False
@@ -490,26 +640,26 @@ class WW_OT_Rigify(Operator):
                     ('Bip001RFinger3', 'limbs.super_finger', None), ('Bip001RFinger4', 'limbs.super_finger', None),
                 ])
 
+            pose_bones = armature.pose.bones
             for bone_name, rig_type, widget_type in bones_and_rig_types:
-                bone = armature.pose.bones.get(bone_name)
+                bone = pose_bones.get(bone_name)
                 if bone:
-                    armature.data.bones[bone_name].select = True
-                    armature.data.bones.active = armature.data.bones[bone_name]
                     bone.rigify_type = rig_type
                     if widget_type and bone.rigify_parameters:
                         bone.rigify_parameters.super_copy_widget_type = widget_type
 
-            bpy.ops.object.mode_set(mode='EDIT')
+            set_mode('EDIT')
 
-            def duplicate_and_adjust_heel_bone(foot_bone_name, toe_bone_name, heel_bone_name, rotation_angle=1.5708):
+            def duplicate_and_adjust_heel_bone(foot_bone_name, toe_bone_name, heel_bone_name, sign=1):
                 if toe_bone_name in armature.data.edit_bones:
                     toe_bone = armature.data.edit_bones[toe_bone_name]
                     heel_bone = armature.data.edit_bones.new(name=heel_bone_name)
                     heel_bone.head = toe_bone.head
                     heel_bone.tail = toe_bone.tail
                     heel_bone.roll = toe_bone.roll
-                    rotation_matrix = mathutils.Matrix.Rotation(rotation_angle, 4, 'Y')
-                    heel_bone.tail = heel_bone.head + rotation_matrix @ (heel_bone.tail - heel_bone.head)
+                    # A quarter turn about Y is just a swap of x/z with a sign flip
+                    dx, dy, dz = heel_bone.tail - heel_bone.head
+                    heel_bone.tail = heel_bone.head + Vector((sign * dz, dy, -sign * dx))
                     if foot_bone_name in armature.data.edit_bones:
                         foot_bone = armature.data.edit_bones[foot_bone_name]
                         foot_head_y = foot_bone.head[1]
@@ -517,87 +667,38 @@ class WW_OT_Rigify(Operator):
                         heel_bone.tail[1] = foot_head_y
                     heel_bone.parent = armature.data.edit_bones[foot_bone_name]
 
-            duplicate_and_adjust_heel_bone('Bip001LFoot', 'Bip001LToe0', 'Bip001LHeel0', rotation_angle=1.5708)
-            duplicate_and_adjust_heel_bone('Bip001RFoot', 'Bip001RToe0', 'Bip001RHeel0', rotation_angle=-1.5708)
-
-            bpy.ops.object.mode_set(mode='OBJECT')
+            duplicate_and_adjust_heel_bone('Bip001LFoot', 'Bip001LToe0', 'Bip001LHeel0', sign=1)
+            duplicate_and_adjust_heel_bone('Bip001RFoot', 'Bip001RToe0', 'Bip001RHeel0', sign=-1)
 
-            # Rename bones
+            # Rename bones in the same edit session; the heel bones are picked up too
             print("DEBUG: Starting bone renaming process...")
-            armature = context.object
-            bpy.ops.object.mode_set(mode='EDIT')
             
-            name_mapping = {
-                "Bip001Neck": "neck", "Bip001Head": "head", "Bip001Clavicle": "shoulder",
-                "Bip001UpperArm": "upper_arm", "Bip001Forearm": "forearm", "Bip001Hand": "hand",
-                "Bip001Thigh": "thigh", "Bip001Calf": "shin", "Bip001Foot": "foot", "Bip001Toe0": "toe_ik",
-                "Bip001Spine": "Spine", "Bip001Spine1": "Spine1", "Bip001Spine2": "Spine2", "Bip001Pelvis": "Pelvis",
-                "Bip001Finger0": "thumb.01", "Bip001Finger01": "thumb.02", "Bip001Finger02": "thumb.03",
-            }
-            
-            # Add finger mappings based on whether Finger13 exists
-            # For models WITH Finger13: Finger11→01, Finger12→02, Finger13→03
-            # For models WITHOUT Finger13: Finger1→01, Finger11→02, Finger12→03
-            if finger13_exists_left or finger13_exists_right:
-                name_mapping.update({
-                    "Bip001Finger11": "f_index.01", "Bip001Finger12": "f_index.02", "Bip001Finger13": "f_index.03",
-                    "Bip001Finger21": "f_middle.01", "Bip001Finger22": "f_middle.02", "Bip001Finger23": "f_middle.03",
-                    "Bip001Finger31": "f_ring.01", "Bip001Finger32": "f_ring.02", "Bip001Finger33": "f_ring.03",
-                    "Bip001Finger41": "f_pinky.01", "Bip001Finger42": "f_pinky.02", "Bip001Finger43": "f_pinky.03",
-                })
-            else:
-                name_mapping.update({
-                    "Bip001Finger1": "f_index.01", "Bip001Finger11": "f_index.02", "Bip001Finger12": "f_index.03",
-                    "Bip001Finger2": "f_middle.01", "Bip001Finger21": "f_middle.02", "Bip001Finger22": "f_middle.03",
-                    "Bip001Finger3": "f_ring.01", "Bip001Finger31": "f_ring.02", "Bip001Finger32": "f_ring.03",
-                    "Bip001Finger4": "f_pinky.01", "Bip001Finger41": "f_pinky.02", "Bip001Finger42": "f_pinky.03",
-                })
+            name_mapping = RIGIFY_NAME_MAPPING | (
+                FINGER13_NAME_MAPPING if finger13_exists_left or finger13_exists_right
+                else FINGER12_NAME_MAPPING
+            )
             
+            # Bone names can't go through foreach_set (strings aren't supported),
+            # so collect the renames and write them through the bone refs.
             final_renames = {}
-            current_bones = list(armature.data.edit_bones)
-            
-            for bone in current_bones:
+            renamed_bones = []
+            for bone in armature.data.edit_bones:
                 original_name = bone.name
-                new_name = original_name
-                
-                if new_name.startswith("Bip001R") and not new_name.endswith(".R"):
-                    new_name += ".R"
-                elif new_name.startswith("Bip001L") and not new_name.endswith(".L"):
-                    new_name += ".L"
-                
-                base_name_check = new_name
-                suffix = ""
-                if base_name_check.endswith(".L"):
-                    base_name_check = base_name_check[:-2]; suffix = ".L"
-                elif base_name_check.endswith(".R"):
-                    base_name_check = base_name_check[:-2]; suffix = ".R"
-                
-                if base_name_check.startswith("Bip001R"):
-                    base_name_check = base_name_check.replace("Bip001R", "Bip001", 1)
-                elif base_name_check.startswith("Bip001L"):
-                    base_name_check = base_name_check.replace("Bip001L", "Bip001", 1)
-                
-                if base_name_check in name_mapping:
-                    new_name = name_mapping[base_name_check] + suffix
-                else:
-                    if base_name_check != original_name:
-                         if new_name.startswith("Bip001L") or new_name.startswith("Bip001R"):
-                             new_name = base_name_check + suffix
-
+                new_name = rigify_bone_name(original_name, name_mapping)
                 if new_name != original_name:
                     final_renames[original_name] = new_name
+                    renamed_bones.append((bone, new_name))
 
-            for old_name, new_name in final_renames.items():
-                if old_name in armature.data.edit_bones:
-                    armature.data.edit_bones[old_name].name = new_name
+            for bone, new_name in renamed_bones:
+                bone.name = new_name
             
-            bpy.ops.object.mode_set(mode='OBJECT')
+            set_mode('OBJECT')
             bpy.ops.object.select_all(action='DESELECT')
             armature.select_set(True)
             context.view_layer.objects.active = armature
             context.view_layer.update()
             
-            bpy.ops.object.mode_set(mode='POSE')
+            set_mode('POSE')
             for bone in armature.pose.bones:
                 for key in bone.keys():
                     if key.startswith("_"): continue
@@ -608,7 +709,7 @@ class WW_OT_Rigify(Operator):
             bpy.ops.pose.rigify_generate()
 
         # --------------- Post Generation Logic --------------- #
-        bpy.ops.object.mode_set(mode='POSE')
+        set_mode('POSE')
         armature = context.object # This might be the rig now if rigify_generate switched context? No, usually it makes new rig active.
         
         # NOTE: Rigify generate usually creates a NEW armature object active. 
@@ -624,42 +725,38 @@ class WW_OT_Rigify(Operator):
         
         if RigArmatureObj:
              context.view_layer.objects.active = RigArmatureObj
+             pose_bones = RigArmatureObj.pose.bones
              
              # Adjust Neck/Head Custom Shapes
-             pose_bone_neck = RigArmatureObj.pose.bones.get("neck")
+             # The rest lengths are on the Bone data, no EDIT mode round trip needed
+             pose_bone_neck = pose_bones.get("neck")
              if pose_bone_neck:
-                 bpy.ops.object.mode_set(mode='EDIT')
-                 edit_bone_neck = RigArmatureObj.data.edit_bones.get("neck")
-                 if edit_bone_neck:
-                     neck_length = (edit_bone_neck.tail - edit_bone_neck.head).length / 2
-                 bpy.ops.object.mode_set(mode='POSE')
+                 neck_length = pose_bone_neck.bone.length / 2
                  pose_bone_neck.custom_shape_translation.y = neck_length
                  pose_bone_neck.custom_shape_scale_xyz = (1.5, 1.5, 1.5)
 
-             pose_bone_head = RigArmatureObj.pose.bones.get("head")
+             pose_bone_head = pose_bones.get("head")
              if pose_bone_head:
-                 bpy.ops.object.mode_set(mode='EDIT')
-                 edit_bone_head = RigArmatureObj.data.edit_bones.get("head")
-                 if edit_bone_head:
-                     head_length = (edit_bone_head.tail - edit_bone_head.head).length
-                 bpy.ops.object.mode_set(mode='POSE')
+                 head_length = pose_bone_head.bone.length
                  pose_bone_head.custom_shape_translation.y = head_length * 1.2
                  pose_bone_head.custom_shape_scale_xyz = (2, 2, 2)
                  
-             bpy.ops.object.mode_set(mode='OBJECT')
+             set_mode('OBJECT')
              
              # IK Stretch
              for b_name in ["upper_arm_parent.L", "upper_arm_parent.R", "thigh_parent.L", "thigh_parent.R"]:
-                 if b_name in RigArmatureObj.pose.bones:
-                     RigArmatureObj.pose.bones[b_name]["IK_Stretch"] = 0.000
+                 if b_name in pose_bones:
+                     pose_bones[b_name]["IK_Stretch"] = 0.000
              
-             # ORG Deform
+             # ORG Deform (Bone.use_deform is writable outside EDIT mode)
              bpy.context.view_layer.objects.active = RigArmatureObj
-             bpy.ops.object.mode_set(mode='EDIT')
-             for bone in RigArmatureObj.data.edit_bones:
-                 if bone.name.startswith('ORG-'):
-                     bone.use_deform = True
-             bpy.ops.object.mode_set(mode='OBJECT')
+             rig_bones = RigArmatureObj.data.bones
+             use_deform = np.zeros(len(rig_bones), dtype=bool)
+             rig_bones.foreach_get('use_deform', use_deform)
+             use_deform |= np.fromiter(
+                 (name.startswith('ORG-') for name in rig_bones.keys()), dtype=bool, count=len(rig_bones)
+             )
+             rig_bones.foreach_set('use_deform', use_deform)
              
              # Mesh updates
              bpy.ops.object.select_all(action='DESELECT')
@@ -695,29 +792,11 @@ class WW_OT_Rigify(Operator):
                     "ORG-Bip001_R_CalfTwist": "DEF-shin.R.001",
                  }
                  
-                 vgroups = CharacterMesh.vertex_groups
-                 for source, target in weight_mappings.items():
-                     if source in vgroups:
-                         src_grp = vgroups[source]
-                         if target not in vgroups: tgt_grp = vgroups.new(name=target)
-                         else: tgt_grp = vgroups[target]
-                         
-                         for vert in CharacterMesh.data.vertices:
-                             w = 0.0
-                             has_w = False
-                             for g in vert.groups:
-                                 if g.group == src_grp.index:
-                                     w += g.weight; has_w = True; break
-                             if has_w:
-                                 for g in vert.groups:
-                                     if g.group == tgt_grp.index:
-                                         w += g.weight; break
-                                 tgt_grp.add([vert.index], w, 'REPLACE')
-                                 src_grp.remove([vert.index])
+                 transfer_vertex_weights(CharacterMesh, weight_mappings)
 
                  # Armature Modifier update
                  for modifier in CharacterMesh.modifiers:
-                     if modifier.type == 'ARMATURE' and modifier.object and modifier.object.name == OrigArmature:
+                     if modifier.type == 'ARMATURE' and modifier.object == selected_object:
                          modifier.object = RigArmatureObj
                  
                  CharacterMesh.parent = RigArmatureObj
@@ -725,104 +804,126 @@ class WW_OT_Rigify(Operator):
 
                  # Secondary Shape Keys
                  source_shape_keys = ["Pupil_R", "Pupil_L", "Pupil_Up", "Pupil_Down"]
-                 target_material_name = None
-                 for slot in CharacterMesh.material_slots:
-                     if "Eye" in slot.name:
-                         target_material_name = slot.name
-                         break
+                 # Slot indices of the eye material, compared against polygon material indices
+                 mesh = CharacterMesh.data
+                 shape_keys = mesh.shape_keys
+                 slot_names = [slot.name for slot in CharacterMesh.material_slots]
+                 target_material_name = next((name for name in slot_names if "Eye" in name), None)
+                 eye_slots = [i for i, name in enumerate(slot_names) if name == target_material_name]
                  
-                 offset_connected = Vector((0.0, -0.001, 0.0))
-                 offset_unconnected = Vector((0.0, 0.001, 0.0))
+                 offset_connected = (0.0, -0.001, 0.0)
+                 offset_unconnected = (0.0, 0.001, 0.0)
                  NEIGHBOR_DEPTH = 4
 
-                 if CharacterMesh.data.shape_keys and target_material_name:
-                     keys = CharacterMesh.data.shape_keys.key_blocks
-                     basis = CharacterMesh.data.shape_keys.reference_key
+                 if shape_keys and eye_slots:
+                     keys = shape_keys.key_blocks
+                     basis = shape_keys.reference_key
                      
-                     bpy.ops.object.mode_set(mode='OBJECT')
+                     set_mode('OBJECT')
                      
-                     mat_slots = CharacterMesh.material_slots
-                     relevant_face_vert_indices = set()
-                     relevant_edges = set()
-                     for poly in CharacterMesh.data.polygons:
-                         if poly.material_index < len(mat_slots) and mat_slots[poly.material_index].name == target_material_name:
-                             relevant_face_vert_indices.update(poly.vertices)
-                             relevant_edges.update(tuple(sorted((poly.vertices[i], poly.vertices[j])))
-                                                   for i in range(len(poly.vertices)) for j in range(i + 1, len(poly.vertices)))
+                     nverts = len(mesh.vertices)
+                     npolys = len(mesh.polygons)
+                     mat_idx = np.empty(npolys, dtype=np.int32)
+                     loop_start = np.empty(npolys, dtype=np.int32)
+                     loop_total = np.empty(npolys, dtype=np.int32)
+                     mesh.polygons.foreach_get('material_index', mat_idx)
+                     mesh.polygons.foreach_get('loop_start', loop_start)
+                     mesh.polygons.foreach_get('loop_total', loop_total)
+                     loop_vi = np.empty(len(mesh.loops), dtype=np.int32)
+                     mesh.loops.foreach_get('vertex_index', loop_vi)
+
+                     # One material mask shared by the vertex and edge passes
+                     eye_polys = np.isin(mat_idx, eye_slots)
+                     relevant_mask = np.zeros(nverts, dtype=bool)
+                     relevant_mask[loop_vi[np.repeat(eye_polys, loop_total)]] = True
                      
-                     if relevant_face_vert_indices:
-                         connectivity = defaultdict(set)
-                         edge_faces = defaultdict(int)
-                         for poly in CharacterMesh.data.polygons:
-                             if poly.material_index < len(mat_slots) and mat_slots[poly.material_index].name == target_material_name:
-                                 verts = poly.vertices
-                                 for i in range(len(verts)):
-                                     for j in range(i + 1, len(verts)):
-                                         vi, vj = verts[i], verts[j]
-                                         edge = tuple(sorted((vi, vj)))
-                                         if vi in relevant_face_vert_indices and vj in relevant_face_vert_indices:
-                                             connectivity[vi].add(vj)
-                                             connectivity[vj].add(vi)
-                                             edge_faces[edge] += 1
+                     if relevant_mask.any():
+                         # Every vertex pair of every eye polygon, packed as (lo << 32) | hi.
+                         # Polygons are grouped by size so each group is a plain 2D array.
+                         eye_start = loop_start[eye_polys]
+                         eye_total = loop_total[eye_polys]
+                         edge_keys = []
+                         for size in np.unique(eye_total):
+                             starts = eye_start[eye_total == size]
+                             poly_verts = loop_vi[starts[:, None] + np.arange(size)].astype(np.uint64)
+                             i, j = np.triu_indices(size, 1)
+                             a, b = poly_verts[:, i], poly_verts[:, j]
+                             edge_keys.append(((np.minimum(a, b) << np.uint64(32)) | np.maximum(a, b)).ravel())
+                         edge_keys, edge_faces = np.unique(np.concatenate(edge_keys), return_counts=True)
+                         edge_lo = (edge_keys >> np.uint64(32)).astype(np.int64)
+                         edge_hi = (edge_keys & np.uint64(0xFFFFFFFF)).astype(np.int64)
+
+                         # Vertex adjacency in CSR form: neighbours of v are indices[indptr[v]:indptr[v + 1]]
+                         adj_src = np.concatenate((edge_lo, edge_hi))
+                         adj_dst = np.concatenate((edge_hi, edge_lo))
+                         indices = adj_dst[np.argsort(adj_src, kind='stable')]
+                         indptr = np.zeros(nverts + 1, dtype=np.int64)
+                         np.cumsum(np.bincount(adj_src, minlength=nverts), out=indptr[1:])
                          
-                         seed_vertices = {v for v, linked in connectivity.items() if len(linked) > 10}
-                         connected_vertices = set()
-                         visited = set()
-                         for seed in seed_vertices:
-                             queue = deque()
-                             queue.append((seed, 0))
-                             visited.add(seed)
-                             connected_vertices.add(seed)
-                             while queue:
-                                 current, depth = queue.popleft()
-                                 if depth >= NEIGHBOR_DEPTH: continue
-                                 for neighbor in connectivity[current]:
-                                     if neighbor not in visited:
-                                         visited.add(neighbor)
-                                         connected_vertices.add(neighbor)
-                                         queue.append((neighbor, depth + 1))
+                         seed_vertices = np.flatnonzero(np.diff(indptr) > 10)
+                         connected_mask = np.zeros(nverts, dtype=bool)
+                         grow_vertex_region(indptr, indices, seed_vertices, NEIGHBOR_DEPTH, connected_mask)
                          
-                         unconnected_vertices = relevant_face_vert_indices - connected_vertices
-                         border_vertices = set()
-                         for edge, count in edge_faces.items():
-                             if count == 1: border_vertices.update(edge)
+                         border_edges = edge_faces == 1
+                         border_mask = np.zeros(nverts, dtype=bool)
+                         border_mask[edge_lo[border_edges]] = True
+                         border_mask[edge_hi[border_edges]] = True
                          
-                         movable_unconnected = unconnected_vertices - border_vertices
+                         movable_unconnected = relevant_mask & ~connected_mask & ~border_mask
+
+                         # Work on flat coordinate buffers instead of going through key.data[i].co
+                         base_co = np.empty(nverts * 3, dtype=np.float32)
+                         basis.data.foreach_get('co', base_co)
+                         base_co = base_co.reshape(-1, 3)
+
+                         # Only the eye vertices move; everything else keeps the basis position
+                         relevant = np.flatnonzero(relevant_mask)
+                         relevant_base = base_co[relevant]
+                         offsets = np.zeros((len(relevant), 3), dtype=np.float32)
+                         offsets[movable_unconnected[relevant]] = offset_unconnected
+                         offsets[connected_mask[relevant]] = offset_connected
+                         is_left = relevant_base[:, 0] >= 0
+                         left_rows, right_rows = relevant[is_left], relevant[~is_left]
+                         source_co = np.empty(nverts * 3, dtype=np.float32)
+                         new_co = np.empty_like(relevant_base)
+                         key_co = np.empty_like(base_co)
                          
+                         # New keys are appended, so indices of the existing ones stay valid
+                         key_index = {k.name: i for i, k in enumerate(keys)}
                          for source_name in source_shape_keys:
-                             if source_name not in keys: continue
-                             source_key = keys[source_name]
-                             index = next(i for i, k in enumerate(keys) if k.name == source_key.name)
+                             if (index := key_index.get(source_name)) is None: continue
+                             source_key = keys[index]
                              CharacterMesh.active_shape_key_index = index
                              
                              bpy.ops.object.shape_key_add(from_mix=False)
-                             key_L = CharacterMesh.data.shape_keys.key_blocks[-1]
+                             key_L = keys[-1]
                              key_L.name = f"{source_name}.L"
                              
                              bpy.ops.object.shape_key_add(from_mix=False)
-                             key_R = CharacterMesh.data.shape_keys.key_blocks[-1]
+                             key_R = keys[-1]
                              key_R.name = f"{source_name}.R"
                              
-                             for i in relevant_face_vert_indices:
-                                 base_co = basis.data[i].co
-                                 source_co = source_key.data[i].co
-                                 delta = source_co - base_co
-                                 
-                                 if i in connected_vertices: offset = offset_connected
-                                 elif i in movable_unconnected: offset = offset_unconnected
-                                 else: offset = Vector((0.0, 0.0, 0.0))
-                                 
-                                 if base_co.x >= 0: key_L.data[i].co = base_co + delta * 2 + offset
-                                 else: key_R.data[i].co = base_co + delta * 2 + offset
+                             # base + 2 * (source - base) + offset, reusing the same buffers for every key
+                             source_key.data.foreach_get('co', source_co)
+                             np.subtract(source_co.reshape(-1, 3)[relevant], relevant_base, out=new_co)
+                             new_co *= 2
+                             new_co += relevant_base
+                             new_co += offsets
+
+                             for key, rows, side in ((key_L, left_rows, is_left), (key_R, right_rows, ~is_left)):
+                                 np.copyto(key_co, base_co)
+                                 key_co[rows] = new_co[side]
+                                 key.data.foreach_set('co', key_co.ravel())
                              
                              bpy.ops.object.select_all(action='DESELECT')
                      
                  # Eye Tracker
                  context.view_layer.objects.active = RigArmatureObj
-                 bpy.ops.object.mode_set(mode='EDIT')
-                 target_bone = RigArmatureObj.data.edit_bones.get("ORG-head")
+                 set_mode('EDIT')
+                 edit_bones = RigArmatureObj.data.edit_bones
+                 target_bone = edit_bones.get("ORG-head")
                  if target_bone:
-                     new_bone = RigArmatureObj.data.edit_bones.new("EyeTracker")
+                     new_bone = edit_bones.new("EyeTracker")
                      new_bone.head = target_bone.head.copy()
                      new_bone.head.y -= 0.15; new_bone.head.z += 0.03
                      new_bone.tail = new_bone.head + Vector((0, 0, 0.03))
@@ -833,17 +934,62 @@ class WW_OT_Rigify(Operator):
                      y_off = new_bone.tail.y - new_bone.head.y
                      z_off = new_bone.tail.z - new_bone.head.z
                      
-                     eye_l = RigArmatureObj.data.edit_bones.new("Eye.L")
+                     eye_l = edit_bones.new("Eye.L")
                      eye_l.head = et_head + Vector((0.03, 0, 0))
                      eye_l.tail = eye_l.head + Vector((0, y_off, z_off))
                      eye_l.parent = new_bone; eye_l.use_connect = False
                      
-                     eye_r = RigArmatureObj.data.edit_bones.new("Eye.R")
+                     eye_r = edit_bones.new("Eye.R")
                      eye_r.head = et_head + Vector((-0.03, 0, 0))
                      eye_r.tail = eye_r.head + Vector((0, y_off, z_off))
                      eye_r.parent = new_bone; eye_r.use_connect = False
                  
-                 bpy.ops.object.mode_set(mode='OBJECT')
+                 # Create FK toe bones (toe_fk.L/R) from ORG-toe_ik bones
+                 for side in ['.L', '.R']:
+                     org_toe = edit_bones.get(f'ORG-toe_ik{side}')
+                     foot_fk = edit_bones.get(f'foot_fk{side}')
+                     if org_toe and foot_fk:
+                         new_bone = edit_bones.new(f'toe_fk{side}')
+                         new_bone.head = org_toe.head.copy()
+                         new_bone.tail = org_toe.tail.copy()
+                         new_bone.roll = org_toe.roll
+                         new_bone.parent = foot_fk
+                         new_bone.use_connect = True
+                 
+                 # Neck Tweak
+                 if 'ORG-Bip001Neck' in edit_bones: edit_bones['ORG-Bip001Neck'].name = 'Bip001Neck'
+                 if 'ORG-Bip001Head' in edit_bones: edit_bones['ORG-Bip001Head'].name = 'Bip001Head'
+                 
+                 if 'Bip001Neck' in edit_bones:
+                     neck_bone = edit_bones['Bip001Neck']
+                     new_bone = edit_bones.new('Bip001Neck._fk')
+                     new_bone.head = neck_bone.head.copy(); new_bone.tail = neck_bone.tail.copy(); new_bone.roll = neck_bone.roll
+                     new_bone.parent = neck_bone.parent
+                     rot_mat = mathutils.Matrix.Rotation(-1.5708, 4, 'X')
+                     new_bone.tail = new_bone.head + rot_mat @ (new_bone.tail - new_bone.head)
+                     new_bone.tail.z = new_bone.head.z
+                     new_bone.tail = new_bone.head + (new_bone.tail - new_bone.head).normalized() * 0.05
+                     neck_bone.use_connect = False; neck_bone.parent = new_bone
+                 
+                 if 'Bip001Head' in edit_bones:
+                     head_bone = edit_bones['Bip001Head']
+                     new_bone = edit_bones.new('Bip001Head._fk')
+                     new_bone.head = head_bone.head.copy(); new_bone.tail = head_bone.tail.copy(); new_bone.roll = head_bone.roll
+                     new_bone.parent = head_bone.parent
+                     rot_mat = mathutils.Matrix.Rotation(-1.5708, 4, 'X') # Re-using variable, safe
+                     new_bone.tail = new_bone.head + rot_mat @ (new_bone.tail - new_bone.head)
+                     new_bone.tail.z = new_bone.head.z
+                     new_bone.tail = new_bone.head + (new_bone.tail - new_bone.head).normalized() * 0.05
+                     head_bone.use_connect = False; head_bone.parent = new_bone
+                 
+                 # Bone Limit
+                 for bone in edit_bones:
+                     head = bone.head
+                     offset = bone.tail - head
+                     if (length_sq := offset.length_squared) > 1.0:
+                         bone.tail = head + offset * (0.5 / math.sqrt(length_sq))
+                 
+                 set_mode('OBJECT')
                  
                  # Widget Creation
                  create_circle_widget("WGT-rig_eye.L", radius=0.1, location=(-0.3, 0, 0))
@@ -852,16 +998,17 @@ class WW_OT_Rigify(Operator):
                  
                  # Assign Widgets
                  context.view_layer.objects.active = RigArmatureObj
-                 bpy.ops.object.mode_set(mode='POSE')
+                 set_mode('POSE')
+                 pose_bones = RigArmatureObj.pose.bones
                  custom_shapes = {"EyeTracker": "WGT-rig_eyes", "Eye.L": "WGT-rig_eye.L", "Eye.R": "WGT-rig_eye.R"}
                  for b_name, s_name in custom_shapes.items():
-                     if b_name in RigArmatureObj.pose.bones and s_name in bpy.data.objects:
-                         RigArmatureObj.pose.bones[b_name].custom_shape = bpy.data.objects[s_name]
-                         RigArmatureObj.pose.bones[b_name].custom_shape_scale_xyz = (4.0, 4.0, 4.0)
+                     if b_name in pose_bones and s_name in bpy.data.objects:
+                         pose_bones[b_name].custom_shape = bpy.data.objects[s_name]
+                         pose_bones[b_name].custom_shape_scale_xyz = (4.0, 4.0, 4.0)
 
 
                  # Drivers
-                 if CharacterMesh.data.shape_keys:
+                 if shape_keys:
                      shape_key_names = {
                         "Pupil_L": "LOC_X", "Pupil_R": "LOC_X",
                         "Pupil_Up": "LOC_Y", "Pupil_Down": "LOC_Y"
@@ -873,38 +1020,20 @@ class WW_OT_Rigify(Operator):
                         "Pupil_Down": 'max(min((-bone_y * 10), 1), 0) if bone_y < 0 else 0'
                      }
                      
-                     for shape_key_name, transform_axis in shape_key_names.items():
-                         if shape_key_name in CharacterMesh.data.shape_keys.key_blocks:
-                             shape_key = CharacterMesh.data.shape_keys.key_blocks[shape_key_name]
-                             driver = shape_key.driver_add('value').driver
-                             driver.type = 'SCRIPTED'
-                             var = driver.variables.new()
-                             var.name = 'bone_' + transform_axis[-1].lower()
-                             var.type = 'TRANSFORMS'
-                             var.targets[0].id = RigArmatureObj
-                             var.targets[0].bone_target = "EyeTracker"
-                             var.targets[0].transform_type = transform_axis
-                             var.targets[0].transform_space = 'LOCAL_SPACE'
-                             driver.expression = expressions[shape_key_name]
-
-                     for bone_suffix in ['.L', '.R']:
-                         bone_name = "Eye" + bone_suffix
-                         for shape_key_prefix, transform_axis in shape_key_names.items():
-                             shape_key_name = shape_key_prefix + bone_suffix
-                             if shape_key_name in CharacterMesh.data.shape_keys.key_blocks:
-                                 shape_key = CharacterMesh.data.shape_keys.key_blocks[shape_key_name]
-                                 driver = shape_key.driver_add('value').driver
-                                 driver.type = 'SCRIPTED'
-                                 var = driver.variables.new()
-                                 var.name = 'bone_' + transform_axis[-1].lower()
-                                 var.type = 'TRANSFORMS'
-                                 var.targets[0].id = RigArmatureObj
-                                 var.targets[0].bone_target = bone_name
-                                 var.targets[0].transform_type = transform_axis
-                                 var.targets[0].transform_space = 'LOCAL_SPACE'
-                                 driver.expression = expressions[shape_key_prefix]
-
-                 bpy.ops.object.mode_set(mode='OBJECT')
+                     driver_specs = [(name, "EyeTracker", name) for name in shape_key_names]
+                     driver_specs += [
+                         (prefix + suffix, "Eye" + suffix, prefix)
+                         for suffix in ('.L', '.R') for prefix in shape_key_names
+                     ]
+                     key_blocks = shape_keys.key_blocks
+                     for shape_key_name, bone_name, prefix in driver_specs:
+                         if key_block := key_blocks.get(shape_key_name):
+                             add_transform_driver(
+                                 key_block, RigArmatureObj, bone_name,
+                                 shape_key_names[prefix], expressions[prefix],
+                             )
+
+                 set_mode('OBJECT')
                  
 
                  # Move Widgets to WGTS collection instead of deleting
@@ -943,7 +1072,7 @@ class WW_OT_Rigify(Operator):
 
 
                  # Assign Collections, Themes, Skirt separation, etc.
-                 bpy.ops.object.mode_set(mode='POSE')
+                 set_mode('POSE')
                  bones_to_move = {
                     0: ["torso", "chest", "shoulder.L", "shoulder.R", "hips", "neck", "head"],
                     1: ["Spine_fk", "Spine1_fk", "Spine2_fk", "tweak_Spine1",
@@ -979,24 +1108,27 @@ class WW_OT_Rigify(Operator):
                     12: 'THEME03', 13: 'THEME03', 14: 'THEME04', 15: 'THEME04',
                  }
                  
-                 for group_index, b_names in bones_to_move.items():
-                     theme = theme_for_groups.get(group_index)
-                     for b_name in b_names:
-                         bone = RigArmatureObj.pose.bones.get(b_name)
-                         if bone and theme: bone.color.palette = theme
+                 # Later groups win, as they did when each group was moved in turn
+                 bone_to_collection = {b_name: col for col, b_names in bones_to_move.items() for b_name in b_names}
+                 grouped_bones = {}
+                 for b_name, collection_index in bone_to_collection.items():
+                     bone = pose_bones.get(b_name)
+                     if bone:
+                         theme = theme_for_groups.get(collection_index)
+                         if theme: bone.color.palette = theme
+                         grouped_bones.setdefault(collection_index, []).append(bone)
                  
-                 for collection_index, b_names in bones_to_move.items():
+                 for collection_index, bones in grouped_bones.items():
                      bpy.ops.pose.select_all(action='DESELECT')
-                     for b_name in b_names:
-                         bone = RigArmatureObj.pose.bones.get(b_name)
-                         if bone: bone.bone.select = True
+                     for bone in bones:
+                         bone.bone.select = True
                      bpy.ops.armature.move_to_collection(collection_index=collection_index)
                  
                  # Set ORG visible
-                 if "ORG" in RigArmatureObj.data.collections_all:
-                     RigArmatureObj.data.collections_all["ORG"].is_visible = True
+                 if org_col := RigArmatureObj.data.collections_all.get("ORG"):
+                     org_col.is_visible = True
                  
-                 bpy.ops.object.mode_set(mode='POSE')
+                 set_mode('POSE')
                  # Helper loop for keywords and collections - updated for new layer structure
                  # Hair bones handled separately
                  select_and_move_hair_bones(RigArmatureObj, 16, 17)  # Hair 1 = 16, Hair 2 = 17
@@ -1010,14 +1142,13 @@ class WW_OT_Rigify(Operator):
                     ("L_ChestBone01", 20), ("L_ChestBone02", 20),
                     ("R_ChestBone01", 20), ("R_ChestBone02", 20),
                  ]
-                 for keyword, collection_index in keywords_and_collections:
-                     select_and_move_bones(RigArmatureObj, keyword, collection_index)
+                 move_bones_by_keywords(RigArmatureObj, keywords_and_collections)
                  
                  # Skirt separation
                  waist_bones = ["Bip001Pelvis", "Bip001Spine", "Bip001Spine1", "Bip001Spine2"]
                  bpy.ops.pose.select_all(action='DESELECT')
                  bones_piao_move = []
-                 for bone in RigArmatureObj.pose.bones:
+                 for bone in pose_bones:
                      if "Piao" in bone.name:
                          parent = bone.parent
                          if parent:
@@ -1031,16 +1162,15 @@ class WW_OT_Rigify(Operator):
                  
                  # Visibility
                  cols_all = RigArmatureObj.data.collections_all
-                 if "ORG" in cols_all: cols_all["ORG"].is_visible = False
-                 for cname in ["Torso (Tweak)", "Fingers (Details)", "Arm.L (FK)", "Arm.R (FK)", "Arm.L (Tweak)", "Arm.R (Tweak)",
-                               "Leg.L (FK)", "Leg.R (FK)", "Leg.L (Tweak)", "Leg.R (Tweak)", "Hair 1", "Hair 2", "Cloth", "Skirt", "Breast / Tail"]:
-                     if cname in cols_all: cols_all[cname].is_visible = False
-                 if "Root" in cols_all: cols_all["Root"].is_visible = True
+                 for cname in ("ORG", "Torso (Tweak)", "Fingers (Details)", "Arm.L (FK)", "Arm.R (FK)", "Arm.L (Tweak)", "Arm.R (Tweak)",
+                               "Leg.L (FK)", "Leg.R (FK)", "Leg.L (Tweak)", "Leg.R (Tweak)", "Hair 1", "Hair 2", "Cloth", "Skirt", "Breast / Tail"):
+                     if col := cols_all.get(cname): col.is_visible = False
+                 if col := cols_all.get("Root"): col.is_visible = True
                  
                  # IK Pole - set property and move to IK collections
                  ik_pole_targets = ["upper_arm_parent.L", "upper_arm_parent.R", "thigh_parent.L", "thigh_parent.R"]
                  for b_name in ik_pole_targets:
-                     bone = RigArmatureObj.pose.bones.get(b_name)
+                     bone = pose_bones.get(b_name)
                      if bone and "pole_vector" in bone: bone["pole_vector"] = True
                  
                  # Move IK pole bones to IK collections
@@ -1056,7 +1186,7 @@ class WW_OT_Rigify(Operator):
                  }
                  for pole_name, col_idx in pole_collection_map.items():
                      bpy.ops.pose.select_all(action='DESELECT')
-                     pole_bone = RigArmatureObj.pose.bones.get(pole_name)
+                     pole_bone = pose_bones.get(pole_name)
                      if pole_bone:
                          pole_bone.bone.select = True
                          bpy.ops.armature.move_to_collection(collection_index=col_idx)
@@ -1064,99 +1194,55 @@ class WW_OT_Rigify(Operator):
                  # Theme Assignments
                  theme_assignments = {"EyeTracker": "THEME01", "Eye.L": "THEME09", "Eye.R": "THEME09"}
                  for b_name, theme in theme_assignments.items():
-                     bone = RigArmatureObj.pose.bones.get(b_name)
+                     bone = pose_bones.get(b_name)
                      if bone: bone.color.palette = theme
                  
-                 # Create FK toe bones (toe_fk.L/R) from ORG-toe_ik bones
-                 bpy.ops.object.mode_set(mode='EDIT')
-                 arm = RigArmatureObj.data
-                 for side in ['.L', '.R']:
-                     org_toe = arm.edit_bones.get(f'ORG-toe_ik{side}')
-                     foot_fk = arm.edit_bones.get(f'foot_fk{side}')
-                     if org_toe and foot_fk:
-                         new_bone = arm.edit_bones.new(f'toe_fk{side}')
-                         new_bone.head = org_toe.head.copy()
-                         new_bone.tail = org_toe.tail.copy()
-                         new_bone.roll = org_toe.roll
-                         new_bone.parent = foot_fk
-                         new_bone.use_connect = True
-                 bpy.ops.object.mode_set(mode='POSE')
-                 
                  # Assign custom shape for FK toe bones
-                 foot_fk_l = RigArmatureObj.pose.bones.get('foot_fk.L')
+                 foot_fk_l = pose_bones.get('foot_fk.L')
                  for side in ['.L', '.R']:
-                     toe_fk = RigArmatureObj.pose.bones.get(f'toe_fk{side}')
+                     toe_fk = pose_bones.get(f'toe_fk{side}')
                      if toe_fk and foot_fk_l:
                          toe_fk.custom_shape = foot_fk_l.custom_shape
                          toe_fk.color.palette = 'THEME03'
                  
                  # Move toe_fk bones to FK leg collections
                  bpy.ops.pose.select_all(action='DESELECT')
-                 toe_fk_l = RigArmatureObj.pose.bones.get('toe_fk.L')
+                 toe_fk_l = pose_bones.get('toe_fk.L')
                  if toe_fk_l:
                      toe_fk_l.bone.select = True
                      bpy.ops.armature.move_to_collection(collection_index=12)
                  bpy.ops.pose.select_all(action='DESELECT')
-                 toe_fk_r = RigArmatureObj.pose.bones.get('toe_fk.R')
+                 toe_fk_r = pose_bones.get('toe_fk.R')
                  if toe_fk_r:
                      toe_fk_r.bone.select = True
                      bpy.ops.armature.move_to_collection(collection_index=13)
 
-                 # Neck Tweak
-                 bpy.ops.object.mode_set(mode='EDIT')
-                 arm = RigArmatureObj.data
-                 if 'ORG-Bip001Neck' in arm.edit_bones: arm.edit_bones['ORG-Bip001Neck'].name = 'Bip001Neck'
-                 if 'ORG-Bip001Head' in arm.edit_bones: arm.edit_bones['ORG-Bip001Head'].name = 'Bip001Head'
-                 
-                 if 'Bip001Neck' in arm.edit_bones:
-                     neck_bone = arm.edit_bones['Bip001Neck']
-                     new_bone = arm.edit_bones.new('Bip001Neck._fk')
-                     new_bone.head = neck_bone.head.copy(); new_bone.tail = neck_bone.tail.copy(); new_bone.roll = neck_bone.roll
-                     new_bone.parent = neck_bone.parent
-                     rot_mat = mathutils.Matrix.Rotation(-1.5708, 4, 'X')
-                     new_bone.tail = new_bone.head + rot_mat @ (new_bone.tail - new_bone.head)
-                     new_bone.tail.z = new_bone.head.z
-                     new_bone.tail = new_bone.head + (new_bone.tail - new_bone.head).normalized() * 0.05
-                     neck_bone.use_connect = False; neck_bone.parent = new_bone
-                 
-                 if 'Bip001Head' in arm.edit_bones:
-                     head_bone = arm.edit_bones['Bip001Head']
-                     new_bone = arm.edit_bones.new('Bip001Head._fk')
-                     new_bone.head = head_bone.head.copy(); new_bone.tail = head_bone.tail.copy(); new_bone.roll = head_bone.roll
-                     new_bone.parent = head_bone.parent
-                     rot_mat = mathutils.Matrix.Rotation(-1.5708, 4, 'X') # Re-using variable, safe
-                     new_bone.tail = new_bone.head + rot_mat @ (new_bone.tail - new_bone.head)
-                     new_bone.tail.z = new_bone.head.z
-                     new_bone.tail = new_bone.head + (new_bone.tail - new_bone.head).normalized() * 0.05
-                     head_bone.use_connect = False; head_bone.parent = new_bone
-                 
-                 bpy.ops.object.mode_set(mode='POSE')
-                 spine2_fk = RigArmatureObj.pose.bones.get("Spine2_fk")
-                 if "Bip001Neck._fk" in RigArmatureObj.pose.bones:
-                     tb = RigArmatureObj.pose.bones["Bip001Neck._fk"]
+                 spine2_fk = pose_bones.get("Spine2_fk")
+                 if "Bip001Neck._fk" in pose_bones:
+                     tb = pose_bones["Bip001Neck._fk"]
                      if spine2_fk: tb.custom_shape = spine2_fk.custom_shape
-                     tb.custom_shape_transform = RigArmatureObj.pose.bones["Bip001Neck"]
-                 if "Bip001Head._fk" in RigArmatureObj.pose.bones:
-                     tb = RigArmatureObj.pose.bones["Bip001Head._fk"]
+                     tb.custom_shape_transform = pose_bones["Bip001Neck"]
+                 if "Bip001Head._fk" in pose_bones:
+                     tb = pose_bones["Bip001Head._fk"]
                      if spine2_fk: tb.custom_shape = spine2_fk.custom_shape
-                     tb.custom_shape_transform = RigArmatureObj.pose.bones["Bip001Head"]
+                     tb.custom_shape_transform = pose_bones["Bip001Head"]
                  
                  # Move tweak bones to collection (index 1)
                  bones_tweak_move = {0: ["Bip001Neck", "Bip001Head"], 1: ["Bip001Neck._fk", "Bip001Head._fk"]}
                  for cidx, bnames in bones_tweak_move.items():
                      bpy.ops.pose.select_all(action='DESELECT')
                      for b in bnames: 
-                         pb = RigArmatureObj.pose.bones.get(b)
+                         pb = pose_bones.get(b)
                          if pb: pb.bone.select = True
                      bpy.ops.armature.move_to_collection(collection_index=cidx)
                  
                  # Setup toe FK/IK switching
                  # toe_fk works in FK mode (IK_FK = 1), toe_ik works in IK mode (IK_FK = 0)
                  for side in ['.L', '.R']:
-                     toe_fk_bone = RigArmatureObj.pose.bones.get(f'toe_fk{side}')
-                     org_toe = RigArmatureObj.pose.bones.get(f'ORG-toe_ik{side}')
-                     toe_ik_bone = RigArmatureObj.pose.bones.get(f'toe_ik{side}')
-                     thigh_parent = RigArmatureObj.pose.bones.get(f'thigh_parent{side}')
+                     toe_fk_bone = pose_bones.get(f'toe_fk{side}')
+                     org_toe = pose_bones.get(f'ORG-toe_ik{side}')
+                     toe_ik_bone = pose_bones.get(f'toe_ik{side}')
+                     thigh_parent = pose_bones.get(f'thigh_parent{side}')
                      
                      if toe_fk_bone and org_toe and thigh_parent and toe_ik_bone:
                          # Check for existing toe_ik copy constraint and add IK_FK driver
@@ -1191,12 +1277,7 @@ class WW_OT_Rigify(Operator):
                          var.targets[0].data_path = f'pose.bones["thigh_parent{side}"]["IK_FK"]'
                          driver.expression = 'ik_fk'
                  
-                 # Bone Limit
-                 bpy.ops.object.mode_set(mode='EDIT')
-                 for bone in RigArmatureObj.data.edit_bones:
-                     if (bone.head - bone.tail).length > 1.0:
-                         bone.tail = bone.head + (bone.tail - bone.head).normalized() * 0.5
-                 bpy.ops.object.mode_set(mode='OBJECT')
+                 set_mode('OBJECT')
                  
                  RigArmatureObj.data.display_type = 'STICK'
                  RigArmatureObj.show_in_front = True
@@ -1,4 +1,5 @@
 import bpy
+import functools
 import logging
 import math
 import os
@@ -8,6 +9,8 @@ from math import cos, pi, sin
 from typing import Any, Dict, List, Optional, Set, Tuple
 
 import mathutils
+import numpy as np
+from bpy.app.handlers import persistent
 from bpy.props import (
     BoolProperty,
     CollectionProperty,
@@ -40,6 +43,16 @@ TEXTURE_TYPE_MAPPINGS = {
     "_ID": ("Mask ID",),
 }
 
+_MESH_MAP_INDEX: Dict[str, int] = {}
+_MESH_MAP_KEY = None
+
+_TEX_SUFFIX_ORDER = tuple(TEXTURE_TYPE_MAPPINGS.items())
+
+WW_MATERIAL_RE = re.compile(r"WW - ([A-Za-z]+)(_?\d+|(?:_[^_]+)*)?")
+_MI_RE = re.compile(r"MI_(.*)")
+_VER_STRIP_CHARS = "0123456789_"
+_CHAR_NAME_RE = re.compile(r"R2T1(.+?)Md\d+_LOD\d+")
+
 LIGHT_MODES = {
     0: "Default",
     1: "Sunrise",
@@ -68,6 +81,9 @@ MaterialTextureData = namedtuple(
         "tex_mode",
     ],
 )
+NodeBuckets = namedtuple(
+    "NodeBuckets", ["tex_images", "shadows_for_hair", "see_through"]
+)
 
 
 def get_armature_from_modifiers(mesh):
@@ -77,52 +93,116 @@ def get_armature_from_modifiers(mesh):
     return None
 
 
+def set_child_of_inverse(constraint):
+    # Same result as bpy.ops.constraint.childof_set_inverse, without the
+    # selection/active-object juggling and context override it needs.
+    target = constraint.target
+    parent_matrix = target.matrix_world.copy()
+    if target.type == "ARMATURE" and (
+        pose_bone := target.pose.bones.get(constraint.subtarget)
+    ):
+        parent_matrix = target.matrix_world @ pose_bone.matrix
+    constraint.inverse_matrix = parent_matrix.inverted()
+
+
+@persistent
+def clear_caches(*_args):
+    global _MESH_MAP_KEY
+    _MESH_MAP_KEY = None
+
+
 def load_image(path: str) -> Optional[bpy.types.Image]:
+    name = os.path.basename(path)
     try:
-        img = bpy.data.images.get(os.path.basename(path))
+        img = bpy.data.images.get(name)
         if not img:
-            logger.info(f"Loading texture: {os.path.basename(path)}")
+            logger.info(f"Loading texture: {name}")
             img = bpy.data.images.load(path)
             img.alpha_mode = "CHANNEL_PACKED"
-            img.colorspace_settings.name = "sRGB" if "_D" in path else "Non-Color"
+            colorspace = "sRGB" if "_D" in path else "Non-Color"
+            if img.colorspace_settings.name != colorspace:
+                img.colorspace_settings.name = colorspace
         return img
     except Exception as e:
         logger.error(f"Failed to load texture image {path}: {str(e)}")
         return None
 
 
-def find_texture_node(
-    material: bpy.types.Material, name: str
-) -> Optional[bpy.types.Node]:
+def index_texture_nodes(material: bpy.types.Material) -> Dict[str, bpy.types.Node]:
     if not material.node_tree:
-        return None
-    return next(
-        (
-            node
-            for node in material.node_tree.nodes
-            if node.name == name and node.type == "TEX_IMAGE"
-        ),
-        None,
+        return {}
+    return {
+        node.name: node
+        for node in material.node_tree.nodes
+        if node.type == "TEX_IMAGE"
+    }
+
+
+def bucket_nodes(material: bpy.types.Material) -> NodeBuckets:
+    buckets = NodeBuckets({}, [], [])
+    if not material.node_tree:
+        return buckets
+    for node in material.node_tree.nodes:
+        node_type = node.type
+        if node_type == "TEX_IMAGE":
+            buckets.tex_images[node.name] = node
+        elif node_type == "GROUP" and (tree := node.node_tree):
+            group_name = tree.name
+            if "Shadows for Hair" in group_name:
+                buckets.shadows_for_hair.append(node)
+            if "See Through" in group_name:
+                buckets.see_through.append(node)
+    return buckets
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_union(patterns: Tuple[str, ...]) -> re.Pattern:
+    # One alternation per pattern list; each branch is a named group so the
+    # matching branch tells us the pattern's priority.
+    return re.compile(
+        "|".join(f"(?P<p{i}>{pattern})" for i, pattern in enumerate(patterns))
     )
 
 
 def find_texture(
-    textures: List[Any], patterns: List[str], tex_dir: str
+    textures: List[Any], patterns: List[Any], tex_dir: str
 ) -> Optional[bpy.types.Image]:
-    for pattern in patterns:
-        for file in textures:
-            fname = file.name if hasattr(file, "name") else file
-            if re.match(pattern, fname):
-                return load_image(os.path.join(tex_dir, fname))
-    return None
+    if not patterns:
+        return None
+    union = _compile_union(
+        tuple(p if isinstance(p, str) else p.pattern for p in patterns)
+    )
+
+    # Earlier patterns win over later ones, whatever the file order, so
+    # keep the best branch seen and stop as soon as the first one hits.
+    best_rank, best_name = len(patterns), None
+    for file in textures:
+        fname = file.name if hasattr(file, "name") else file
+        if m := union.match(fname):
+            rank = int(m.lastgroup[1:])
+            if rank < best_rank:
+                best_rank, best_name = rank, fname
+                if rank == 0:
+                    break
+    if best_name is None:
+        return None
+    return load_image(os.path.join(tex_dir, best_name))
 
 
 def set_texture(
-    material: bpy.types.Material, image: bpy.types.Image, nodes: Tuple[str]
+    material: bpy.types.Material,
+    image: bpy.types.Image,
+    nodes: Tuple[str],
+    node_index: Optional[Dict[str, bpy.types.Node]] = None,
 ):
+    if node_index is None:
+        node_index = index_texture_nodes(material)
+    assigned = False
     for node_name in nodes:
-        if node := find_texture_node(material, node_name):
+        if node := node_index.get(node_name):
             node.image = image
+            assigned = True
+    return assigned
 
 
 def set_node_input(material: bpy.types.Material, input_name: str, value: float):
@@ -141,87 +221,133 @@ def set_node_input(material: bpy.types.Material, input_name: str, value: float):
 
 def darken_eye_colors(mesh: bpy.types.Object):
     try:
+        # Corner data is written straight to the mesh, so only edit mode
+        # has to be left, and before the layer is created or fetched: edit
+        # mode keeps its own copy and rebuilds the mesh data on exit.
+        if mesh.mode == "EDIT":
+            bpy.ops.object.mode_set(mode="OBJECT")
+
         if not mesh.data.vertex_colors:
             mesh.data.vertex_colors.new()
-
         vertex_color_layer = mesh.data.vertex_colors.active
-        eye_material_indices = {
+
+        eye_material_indices = frozenset(
             i
             for i, slot in enumerate(mesh.material_slots)
             if slot.material and "Eye" in slot.material.name
-        }
-
+        )
         if not eye_material_indices:
             return
 
-        was_in_object_mode = bpy.context.mode != "VERTEX_PAINT"
-
-        if was_in_object_mode:
-            bpy.ops.object.mode_set(mode="VERTEX_PAINT")
-
-        for poly in mesh.data.polygons:
-            if poly.material_index in eye_material_indices:
-                for loop_idx in poly.loop_indices:
-                    vertex_color_layer.data[loop_idx].color = (0, 0, 0, 1)
-
-        if was_in_object_mode:
-            bpy.ops.object.mode_set(mode="OBJECT")
+        polygons = mesh.data.polygons
+        mat_idx = np.empty(len(polygons), dtype=np.int32)
+        loop_start = np.empty(len(polygons), dtype=np.int32)
+        loop_total = np.empty(len(polygons), dtype=np.int32)
+        polygons.foreach_get("material_index", mat_idx)
+        polygons.foreach_get("loop_start", loop_start)
+        polygons.foreach_get("loop_total", loop_total)
+        is_eye = np.isin(mat_idx, tuple(eye_material_indices))
+        eye_starts = loop_start[is_eye]
+        eye_totals = loop_total[is_eye]
+        # Loop indices of every eye polygon: each polygon's run starts at
+        # its own loop_start, wherever that sits in the loop array.
+        eye_loops = np.repeat(
+            eye_starts - np.cumsum(eye_totals) + eye_totals, eye_totals
+        ) + np.arange(eye_totals.sum())
+
+        colors = np.empty(len(vertex_color_layer.data) * 4, dtype=np.float32)
+        vertex_color_layer.data.foreach_get("color", colors)
+        colors.reshape(-1, 4)[eye_loops] = (0.0, 0.0, 0.0, 1.0)
+        vertex_color_layer.data.foreach_set("color", colors)
+        mesh.data.update()
     except Exception as e:
         logger.error(f"Failed to darken eye vertex colors: {str(e)}")
 
 
+def _last_camel_word(text: str) -> Tuple[int, int]:
+    # Span of the last "[A-Z][a-z]*" run, scanning back from the end.
+    for start in range(len(text) - 1, -1, -1):
+        if "A" <= text[start] <= "Z":
+            end = start + 1
+            while end < len(text) and "a" <= text[end] <= "z":
+                end += 1
+            return start, end
+    return -1, -1
+
+
 def split_material_name(mat_name: str) -> Tuple[str, str]:
     parts = mat_name.split("_", 2)
     if len(parts) < 2:
         return "", ""
 
     category_part = parts[1]
-    words = re.findall(r"[A-Z][a-z]*", category_part)
-    if not words:
+    start, end = _last_camel_word(category_part)
+    if start < 0:
         return "", category_part if len(parts) <= 2 else "_" + parts[2]
 
-    base_part = words[-1]
-    try:
-        version_start = category_part.rindex(base_part) + len(base_part)
-        version = category_part[version_start:]
-        if len(parts) > 2:
-            version += "_" + parts[2]
-    except ValueError:
-        version = ""
+    base_part = category_part[start:end]
+    version = category_part[end:]
+    if len(parts) > 2:
+        version += "_" + parts[2]
     return base_part, version
 
 
+def find_mesh_data(context, mesh_name):
+    global _MESH_MAP_KEY
+    mappings = context.scene.mesh_texture_mappings
+    key = (context.scene.as_pointer(), len(mappings))
+    if key != _MESH_MAP_KEY:
+        _MESH_MAP_INDEX.clear()
+        for i, m in enumerate(mappings):
+            _MESH_MAP_INDEX.setdefault(m.mesh_name, i)
+        _MESH_MAP_KEY = key
+
+    idx = _MESH_MAP_INDEX.get(mesh_name)
+    if idx is None:
+        return None
+    data = mappings[idx]
+    if data.mesh_name != mesh_name:
+        # Collection was reordered behind our back (undo); rescan once.
+        _MESH_MAP_KEY = None
+        return next((m for m in mappings if m.mesh_name == mesh_name), None)
+    return data
+
+
 def get_mesh_data(context, mesh_name):
-    data = next(
-        (m for m in context.scene.mesh_texture_mappings if m.mesh_name == mesh_name),
-        None,
-    )
+    global _MESH_MAP_KEY
+    data = find_mesh_data(context, mesh_name)
     if not data:
-        data = context.scene.mesh_texture_mappings.add()
+        mappings = context.scene.mesh_texture_mappings
+        data = mappings.add()
         data.mesh_name = mesh_name
         data.tex_mode = True
         data.star_move = False
         data.hair_trans = False
+        _MESH_MAP_INDEX[mesh_name] = len(mappings) - 1
+        _MESH_MAP_KEY = (context.scene.as_pointer(), len(mappings))
     return data
 
 
+def _view3d():
+    return next(
+        (area for area in bpy.context.screen.areas if area.type == "VIEW_3D"), None
+    )
+
+
 def set_solid_view():
-    for area in bpy.context.screen.areas:
-        if area.type == "VIEW_3D":
-            area.spaces.active.shading.type = "SOLID"
-            break
+    if area := _view3d():
+        area.spaces.active.shading.type = "SOLID"
 
 
 def set_material_view():
-    for area in bpy.context.screen.areas:
-        if area.type == "VIEW_3D":
-            area.spaces.active.shading.type = "MATERIAL"
-            break
+    if area := _view3d():
+        area.spaces.active.shading.type = "MATERIAL"
 
 
-def get_suffix():
-    base_objects = [
-        o for o in bpy.data.objects if o.name.startswith("Light Direction")]
+def get_suffix(objects=None):
+    if objects is None:
+        objects = bpy.data.objects
+    base_objects = [o for o in objects if o.name.startswith("Light Direction")]
     return (
         "." + base_objects[-1].name.split(".")[-1]
         if len(base_objects) > 1 and "." in base_objects[-1].name
@@ -229,101 +355,130 @@ def get_suffix():
     )
 
 
-def make_texture_patterns(params: TextureSearchParameters):
+@functools.lru_cache(maxsize=2048)
+def make_texture_patterns(params: TextureSearchParameters) -> Tuple[str, ...]:
     patterns = []
-    
+    seen = set()
+
+    def add(*pats):
+        for p in pats:
+            if p not in seen:
+                seen.add(p)
+                patterns.append(p)
+
     # For Version mode (tex_mode=False), add alternative texture patterns first
     # These patterns support: _Switch_D (e.g., Down_Switch_D) and Damage variants (e.g., DownDamage_D)
     if not params.mode:  # Version mode
         if params.original_name:
-            if match := re.search(r"MI_(.*)", params.original_name):
+            if match := _MI_RE.search(params.original_name):
                 base = match.group(1)
-                base_no_ver = re.sub(r"[0-9_]+$", "", base)
+                base_no_ver = base.rstrip(_VER_STRIP_CHARS)
                 
                 # Switch pattern: Down_D -> Down_Switch_D
                 switch_pat = f"T_{base_no_ver}_Switch{params.suffix}"
-                patterns.append(switch_pat)
                 
                 # Damage pattern: Down_D -> DownDamage_D
                 damage_pat = f"T_{base_no_ver}Damage{params.suffix}"
-                patterns.append(damage_pat)
+                add(switch_pat, damage_pat)
         else:
-            base_no_ver = re.sub(r"[0-9_]+$", "", params.base_part)
+            base_no_ver = params.base_part.rstrip(_VER_STRIP_CHARS)
             
             # Switch pattern with regex
             switch_pat = f"T_.*?{base_no_ver}_Switch{params.suffix}"
-            patterns.append(switch_pat)
             
             # Damage pattern with regex
             damage_pat = f"T_.*?{base_no_ver}Damage{params.suffix}"
-            patterns.append(damage_pat)
+            add(switch_pat, damage_pat)
 
     # Original logic for base and version patterns
     if params.original_name:
-        if match := re.search(r"MI_(.*)", params.original_name):
-            base = match.group(1)
-            base_no_ver = re.sub(r"[0-9_]+$", "", base)
-
-            replacements = {"Up": "Upper", "Eye": "Eyes", "Star": "Up"}
-
-            for k, v in replacements.items():
-                if k in base:
-                    base_pat = f"T_{base_no_ver}{params.suffix}"
-                    ver_pat = f"T_{base}{params.suffix}"
-                    patterns.extend(
-                        [ver_pat, base_pat] if not params.mode else [
-                            base_pat, ver_pat]
-                    )
-                    patterns.extend([p.replace(k, v) for p in patterns[:]])
-                    return list(dict.fromkeys(patterns))
-
-            base_pat = f"T_{base_no_ver}{params.suffix}"
-            ver_pat = f"T_{base}{params.suffix}"
-            patterns.extend(
-                [ver_pat, base_pat] if not params.mode else [base_pat, ver_pat]
-            )
+        if not (match := _MI_RE.search(params.original_name)):
+            return tuple(patterns)
+        base = match.group(1)
+        base_no_ver = base.rstrip(_VER_STRIP_CHARS)
+        base_pat = f"T_{base_no_ver}{params.suffix}"
+        ver_pat = f"T_{base}{params.suffix}"
     else:
-        base_no_ver = re.sub(r"[0-9_]+$", "", params.base_part)
+        base = params.base_part
+        base_no_ver = base.rstrip(_VER_STRIP_CHARS)
+        base_pat = f"T_.*?{base_no_ver}{params.suffix}"
+        ver_pat = f"T_.*?{base}{params.version}{params.suffix}"
 
-        replacements = {"Up": "Upper", "Eye": "Eyes", "Star": "Up"}
+    add(*([ver_pat, base_pat] if not params.mode else [base_pat, ver_pat]))
 
-        for k, v in replacements.items():
-            if k in params.base_part:
-                base_pat = f"T_.*?{base_no_ver}{params.suffix}"
-                ver_pat = f"T_.*?{params.base_part}{params.version}{params.suffix}"
-                patterns.extend(
-                    [ver_pat, base_pat] if not params.mode else [base_pat, ver_pat]
-                )
-                patterns.extend([p.replace(k, v) for p in patterns[:]])
-                return list(dict.fromkeys(patterns))
+    replacements = {"Up": "Upper", "Eye": "Eyes", "Star": "Up"}
+
+    for k, v in replacements.items():
+        if k in base:
+            add(*[p.replace(k, v) for p in tuple(patterns)])
+            break
+
+    return tuple(patterns)
 
-        base_pat = f"T_.*?{base_no_ver}{params.suffix}"
-        ver_pat = f"T_.*?{params.base_part}{params.version}{params.suffix}"
-        patterns.extend([ver_pat, base_pat]
-                        if not params.mode else [base_pat, ver_pat])
 
-    return list(dict.fromkeys(patterns))
+def index_original_materials(material_slots) -> Dict[str, str]:
+    # An original material matches (base, version) when its name is
+    # "MI_" + anything + base + version, so index every tail of each MI_
+    # name; setdefault keeps the first slot, as the old scan did.
+    index = {}
+    for slot in material_slots:
+        if slot.material and (name := slot.material.name).startswith("MI_"):
+            for i in range(3, len(name)):
+                index.setdefault(name[i:], name)
+    return index
 
 
-def apply_textures(mat_tex_data: MaterialTextureData):
+def texture_file_names(textures: List[Any]) -> Tuple[str, ...]:
+    return tuple(f.name if hasattr(f, "name") else f for f in textures)
+
+
+@functools.lru_cache(maxsize=8)
+def _names_by_suffix(names: Tuple[str, ...]) -> Dict[str, Tuple[str, ...]]:
+    # Every texture pattern ends in its literal suffix, so a file can only
+    # match a suffix's patterns if the suffix occurs in its name.
+    return {
+        suffix: tuple(name for name in names if suffix in name)
+        for suffix, _ in _TEX_SUFFIX_ORDER
+    }
+
+
+def apply_textures(
+    mat_tex_data: MaterialTextureData,
+    node_index: Optional[Dict[str, bpy.types.Node]] = None,
+):
+    material, material_info, texture_suffixes, textures, tex_dir, tex_mode = (
+        mat_tex_data
+    )
+    base_part, version, original_name = material_info
     has_mask_id = False
-    for suffix, nodes in mat_tex_data.texture_suffixes.items():
+    has_het = False
+    if node_index is None:
+        node_index = index_texture_nodes(material)
+    names = texture_file_names(textures)
+    buckets = _names_by_suffix(names)
+    suffixes = (
+        _TEX_SUFFIX_ORDER
+        if texture_suffixes is TEXTURE_TYPE_MAPPINGS
+        else tuple(texture_suffixes.items())
+    )
+    for suffix, nodes in suffixes:
+        candidates = buckets.get(suffix)
+        if candidates is None:
+            candidates = tuple(name for name in names if suffix in name)
+        if not candidates:
+            continue
         params = TextureSearchParameters(
-            mat_tex_data.material_info.base_part,
-            mat_tex_data.material_info.version,
-            suffix,
-            mat_tex_data.material_info.original_name,
-            mat_tex_data.tex_mode,
+            base_part, version, suffix, original_name, tex_mode
         )
         patterns = make_texture_patterns(params)
-        img = find_texture(mat_tex_data.textures,
-                           patterns, mat_tex_data.tex_dir)
+        img = find_texture(candidates, patterns, tex_dir)
         if img:
-            set_texture(mat_tex_data.material, img, nodes)
+            if set_texture(material, img, nodes, node_index) and "_HET" in img.name:
+                has_het = True
             if suffix == "_ID":
                 has_mask_id = True
-    set_node_input(mat_tex_data.material, "Use ID Color",
-                   1.0 if has_mask_id else 0.0)
+    set_node_input(material, "Use ID Color", 1.0 if has_mask_id else 0.0)
+    return has_het
 
 
 def extract_character_name(name: str, title_case: bool = True) -> str:
@@ -331,7 +486,7 @@ def extract_character_name(name: str, title_case: bool = True) -> str:
     Extracts the character name from the asset name.
     Example: R2T1ChangLiMd10011_LOD0 -> Changli (if title_case=True) or ChangLi
     """
-    if match := re.search(r"R2T1(.+?)Md\d+_LOD\d+", name):
+    if match := _CHAR_NAME_RE.search(name):
         extracted = match.group(1)
         return extracted.title() if title_case else extracted
     return name